@@ -0,0 +1,126 @@
+"""
+Engine profiles
+
+A profile is the set of per-connection SQLite PRAGMAs the engines are
+configured with. Pick one with DB_ENGINE_PROFILE and override single
+settings with the SQLITE_* variables; pool sizing comes from DB_POOL_*.
+"""
+import os
+import time
+from dataclasses import dataclass, replace
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.utils.metrics import db_pool_checkout_seconds
+
+
+@dataclass(frozen=True)
+class EngineProfile:
+    name: str
+    journal_mode: Optional[str] = None  # None leaves the SQLite default
+    synchronous: Optional[str] = None
+    busy_timeout_ms: Optional[int] = None
+    cache_size: Optional[int] = None  # pages, or KiB when negative
+    mmap_size: Optional[int] = None  # bytes
+
+    def pragmas(self) -> List[str]:
+        settings = [
+            ("journal_mode", self.journal_mode),
+            ("synchronous", self.synchronous),
+            ("busy_timeout", self.busy_timeout_ms),
+            ("cache_size", self.cache_size),
+            ("mmap_size", self.mmap_size),
+        ]
+        return [f"PRAGMA {name}={value}" for name, value in settings if value is not None]
+
+
+PROFILES = {
+    # SQLite defaults: rollback journal, full sync, driver-level busy timeout only
+    "legacy": EngineProfile("legacy"),
+    # Readers never block the writer; commits fsync at checkpoints only
+    "wal": EngineProfile(
+        "wal",
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        busy_timeout_ms=10000,
+        cache_size=-16000,
+        mmap_size=128 * 1024 * 1024,
+    ),
+    # WAL with an fsync on every commit
+    "wal-durable": EngineProfile(
+        "wal-durable",
+        journal_mode="WAL",
+        synchronous="FULL",
+        busy_timeout_ms=10000,
+        cache_size=-16000,
+        mmap_size=128 * 1024 * 1024,
+    ),
+}
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else None
+
+def get_profile(name: Optional[str] = None) -> EngineProfile:
+    """Profile selected by name or DB_ENGINE_PROFILE, with SQLITE_* overrides applied"""
+    name = name or os.getenv("DB_ENGINE_PROFILE", "wal")
+    if name not in PROFILES:
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE '{name}'. Choose from: {', '.join(PROFILES)}")
+    overrides = {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS"),
+        "busy_timeout_ms": _env_int("SQLITE_BUSY_TIMEOUT_MS"),
+        "cache_size": _env_int("SQLITE_CACHE_SIZE"),
+        "mmap_size": _env_int("SQLITE_MMAP_SIZE"),
+    }
+    return replace(PROFILES[name], **{k: v for k, v in overrides.items() if v is not None})
+
+def is_sqlite_file(url: str) -> bool:
+    return url.startswith("sqlite") and ":memory:" not in url and not url.rstrip("/").endswith(":")
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited (db_pool_checkout_seconds)"""
+    engine_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_seconds.observe(time.perf_counter() - start, self.engine_label)
+
+class TimedAsyncAdaptedQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    engine_label = "async"
+
+def pool_options(url: str, is_async: bool = False) -> dict:
+    """QueuePool settings from DB_POOL_* (in-memory SQLite uses its own pool and takes none)"""
+    if url.startswith("sqlite") and not is_sqlite_file(url):
+        return {}
+    return {
+        # Set explicitly: aiosqlite would otherwise open a new connection per session
+        "poolclass": TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "-1")),
+    }
+
+def apply_profile(engine: Engine, profile: EngineProfile):
+    """Run the profile's PRAGMAs on every new connection of a (sync) SQLite engine"""
+    if engine.dialect.name != "sqlite":
+        return
+    statements = profile.pragmas()
+    if not statements:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
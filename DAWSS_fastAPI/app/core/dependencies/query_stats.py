@@ -0,0 +1,95 @@
+"""
+Per-request SQL statement counting
+
+Engine events count every statement executed and the time spent in the
+driver. The counts go to whichever QueryStats is active in the current
+context: QueryStatsMiddleware starts one per HTTP request, and
+count_queries() starts one around any block of code. The contextvar is
+inherited by threadpool workers (sync routes) and by the greenlets
+SQLAlchemy uses for async sessions, so both kinds of route are covered.
+
+With QUERY_STATS_HEADER=1 each response carries X-DB-Queries and
+X-DB-Time-Ms (statements run after the headers were sent, e.g. by a
+streaming export, are not included).
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_STATS_HEADER = os.getenv("QUERY_STATS_HEADER", "false").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class QueryStats:
+    statements: int = 0
+    seconds: float = 0.0
+
+    @property
+    def milliseconds(self) -> float:
+        return self.seconds * 1000
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def install(engine: Engine):
+    """Count statements on a (sync) engine; pass async_engine.sync_engine for async engines"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("query_stats_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        starts = conn.info.get("query_stats_start")
+        if stats is None or not starts:
+            return
+        stats.statements += 1
+        stats.seconds += time.perf_counter() - starts.pop()
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """Count the statements executed inside the block
+
+        with count_queries() as stats:
+            ...
+        assert stats.statements <= 2
+    """
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+class QueryStatsMiddleware:
+    """Collects QueryStats for each HTTP request (pure ASGI, so streaming is untouched)"""
+
+    def __init__(self, app, header: bool = QUERY_STATS_HEADER):
+        self.app = app
+        self.header = header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as stats:
+            async def send_with_stats(message):
+                if self.header and message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-queries", str(stats.statements).encode()),
+                        (b"x-db-time-ms", f"{stats.milliseconds:.2f}".encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
@@ -49,7 +49,7 @@ class Booking(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, unique=True)
     seat_id = Column(Integer, ForeignKey("seats.id"), nullable=False, unique=True)
-    payment_status = Column(String, default="pending")  # pending, completed, failed
+    payment_status = Column(String, default="pending")  # pending, processing, completed, failed
     payment_amount = Column(Float, nullable=False)
     payment_transaction_id = Column(String, unique=True)
     booking_date = Column(DateTime, default=datetime.utcnow())
@@ -61,3 +61,28 @@ class Booking(Base):
 
     def __repr__(self):
         return f"<Booking user={self.user_id} seat={self.seat_id} status={self.payment_status}>"
+
+class OutboxStatus(str, enum.Enum):
+    QUEUED = "queued"        # waiting for a payment worker
+    SENDING = "sending"      # a worker is calling the gateway
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class PaymentOutbox(Base):
+    """A charge recorded with the booking's switch to "processing", sent to the gateway by a payment worker"""
+    __tablename__ = "payment_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    booking_id = Column(Integer, nullable=False, index=True)  # no FK: kept for refunds if the booking is removed
+    payment_method = Column(String, nullable=False)
+    payment_token = Column(String)  # cleared once the gateway has answered
+    amount = Column(Float, nullable=False)
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.QUEUED, nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    transaction_id = Column(String)
+    error = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<PaymentOutbox booking={self.booking_id} status={self.status}>"
@@ -25,4 +25,13 @@ class User(Base):
     booking = relationship("Booking", back_populates="user", uselist=False)
 
     def __repr__(self):
-        return f"<User {self.email} ({self.role})>"
\ No newline at end of file
+        return f"<User {self.email} ({self.role})>"
+class AuthEpoch(Base):
+    """One row, bumped whenever users change outside the server (CLI scripts)
+
+    Servers watch it and drop their cached tokens when it moves.
+    """
+    __tablename__ = "auth_epoch"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
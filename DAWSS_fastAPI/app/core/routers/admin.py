@@ -1,53 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import FileResponse, StreamingResponse
+from dataclasses import asdict
+import json
 from sqlalchemy.orm import Session
-from typing import List
-from sqlalchemy import func
+from typing import List, Optional
+from sqlalchemy import func, insert, select
 from app.core.dependencies.database import get_db
 from app.core.schemas.schemas import (
     TableCreate,
     TableResponse,
     AdminDashboardStats,
+    AdminDashboardCounts,
     AdminSeatUpdate,
     AdminAssignSeat,
     BookingResponse
 )
 from app.core.models.user import User
 from app.core.models.seating import Table, Seat, Booking, SeatStatus
+from app.core.utils.booking_queries import booking_rows, booking_row_dict
+from app.core.utils.token_cache import UserSnapshot
 from app.core.utils.auth import get_current_admin
+from app.core.utils.seat_index import seat_index
+from app.core.utils import fast_json
+from app.core.utils.booking_export import export_query, iter_csv, iter_ndjson
+from app.core.utils.layout import LayoutError, apply_layout, parse_layout, validate_layout
+from app.core.utils.profiling import list_profiles, profile_path
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
-@router.get("/dashboard", response_model=AdminDashboardStats)
-async def get_admin_dashboard(
-        current_admin: User = Depends(get_current_admin),
-        db: Session = Depends(get_db)
-):
-    """Get admin dashboard statistics"""
+BOOKINGS_PAGE_SIZE = 100
+BOOKINGS_MAX_PAGE_SIZE = 1000
 
-    total_seats = db.query(Seat).count()
-    available_seats = db.query(Seat).filter(Seat.status == SeatStatus.AVAILABLE).count()
-    reserved_seats = db.query(Seat).filter(Seat.status == SeatStatus.RESERVED).count()
-    pending_payments = db.query(Booking).filter(Booking.payment_status == "pending").count()
+# Admin routes stay on the synchronous Session and are declared with plain
+# ``def`` so FastAPI runs them in its threadpool instead of the event loop.
 
-    total_revenue = db.query(func.sum(Booking.payment_amount)).filter(
-        Booking.payment_status == "completed"
-    ).scalar() or 0.0
+def dashboard_counts(db: Session) -> dict:
+    """Seat counters from the seat index plus one aggregate query over bookings"""
+    seat_index.ensure_fresh(db)
+    seat_counts = seat_index.counts()
 
-    tables = db.query(Table).all()
+    pending_payments, processing_payments, failed_payments, total_revenue = db.execute(
+        select(
+            func.count(Booking.id).filter(Booking.payment_status == "pending"),
+            func.count(Booking.id).filter(Booking.payment_status == "processing"),
+            func.count(Booking.id).filter(Booking.payment_status == "failed"),
+            func.sum(Booking.payment_amount).filter(Booking.payment_status == "completed")
+        )
+    ).one()
 
     return {
-        "total_seats": total_seats,
-        "available_seats": available_seats,
-        "reserved_seats": reserved_seats,
+        "total_seats": sum(seat_counts.values()),
+        "available_seats": seat_counts[SeatStatus.AVAILABLE],
+        "reserved_seats": seat_counts[SeatStatus.RESERVED],
         "pending_payments": pending_payments,
-        "total_revenue": total_revenue,
-        "tables": tables
+        "processing_payments": processing_payments,
+        "failed_payments": failed_payments,
+        "total_revenue": total_revenue or 0.0,
     }
 
+@router.get("/dashboard", response_model=AdminDashboardStats)
+def get_admin_dashboard(
+        current_admin: UserSnapshot = Depends(get_current_admin),
+        db: Session = Depends(get_db)
+):
+    """Get admin dashboard statistics"""
+    stats = dashboard_counts(db)
+    stats["tables"] = seat_index.tables(active_only=False)
+    return fast_json.respond(stats)
+
+@router.get("/dashboard/stats", response_model=AdminDashboardCounts)
+def get_admin_dashboard_stats(
+        current_admin: UserSnapshot = Depends(get_current_admin),
+        db: Session = Depends(get_db)
+):
+    """Get admin dashboard statistics without the table/seat layout"""
+    return dashboard_counts(db)
+
 @router.post("/tables", response_model=TableResponse, status_code=status.HTTP_201_CREATED)
-async def create_table(
+def create_table(
         table_data: TableCreate,
-        current_admin: User = Depends(get_current_admin),
+        current_admin: UserSnapshot = Depends(get_current_admin),
         db: Session = Depends(get_db)
 ):
     """Create a new table with seats"""
@@ -72,25 +104,51 @@ async def create_table(
     db.add(new_table)
     db.flush()  # Get the table ID
 
-    # Create seats for the table
-    for seat_num in range(1, table_data.capacity + 1):
-        seat = Seat(
-            seat_number=seat_num,
-            table_id=new_table.id,
-            status=SeatStatus.AVAILABLE
-        )
-        db.add(seat)
+    # Create seats for the table in one executemany (an empty list is not a valid executemany)
+    seats = [
+        {"seat_number": seat_num, "table_id": new_table.id, "status": SeatStatus.AVAILABLE}
+        for seat_num in range(1, table_data.capacity + 1)
+    ]
+    if seats:
+        db.execute(insert(Seat), seats)
 
     db.commit()
     db.refresh(new_table)
+    seat_index.add_table(new_table)
 
     return new_table
 
+@router.post("/layout", response_model=dict)
+def import_venue_layout(
+        file: UploadFile = File(...),
+        mode: str = Query("merge", pattern="^(merge|replace)$"),
+        dry_run: bool = False,
+        current_admin: UserSnapshot = Depends(get_current_admin),
+        db: Session = Depends(get_db)
+):
+    """Import the venue layout (tables and seats) from a JSON or CSV file"""
+
+    is_json = (file.filename or "").lower().endswith(".json") or file.content_type == "application/json"
+    try:
+        content = file.file.read().decode("utf-8-sig")
+        tables = validate_layout(parse_layout(content, "json" if is_json else "csv"))
+        result = apply_layout(db, tables, mode=mode, dry_run=dry_run)
+    except (LayoutError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=getattr(e, "errors", None) or str(e)
+        )
+
+    if not dry_run:
+        seat_index.reload(db)
+
+    return {"message": result.summary(), "dry_run": dry_run, **asdict(result)}
+
 @router.put("/seats/{seat_id}/status", response_model=dict)
-async def update_seat_status(
+def update_seat_status(
         seat_id: int,
         seat_update: AdminSeatUpdate,
-        current_admin: User = Depends(get_current_admin),
+        current_admin: UserSnapshot = Depends(get_current_admin),
         db: Session = Depends(get_db)
 ):
     """Update seat status (admin override)"""
@@ -104,13 +162,14 @@ async def update_seat_status(
 
     seat.status = seat_update.status
     db.commit()
+    seat_index.set_status(seat_id, seat_update.status)
 
     return {"message": "Seat status updated successfully", "seat_id": seat_id, "new_status": seat_update.status}
 
 @router.post("/assign-seat", response_model=BookingResponse)
-async def admin_assign_seat(
+def admin_assign_seat(
         assignment: AdminAssignSeat,
-        current_admin: User = Depends(get_current_admin),
+        current_admin: UserSnapshot = Depends(get_current_admin),
         db: Session = Depends(get_db)
 ):
     """Manually assign a seat to a user"""
@@ -136,6 +195,8 @@ async def admin_assign_seat(
 
         db.commit()
         db.refresh(existing_booking)
+        seat_index.set_status(old_seat.id, SeatStatus.AVAILABLE)
+        seat_index.set_status(new_seat.id, SeatStatus.RESERVED)
         return existing_booking
 
     # Create new booking
@@ -158,22 +219,74 @@ async def admin_assign_seat(
     db.add(new_booking)
     db.commit()
     db.refresh(new_booking)
+    seat_index.set_status(seat.id, SeatStatus.RESERVED)
 
     return new_booking
 
 @router.get("/bookings", response_model=List[BookingResponse])
-async def get_all_bookings(
-        current_admin: User = Depends(get_current_admin),
+def get_all_bookings(
+        response: Response,
+        after_id: Optional[int] = Query(None, ge=0, description="Cursor: return bookings with a larger id"),
+        limit: Optional[int] = Query(None, ge=1, le=BOOKINGS_MAX_PAGE_SIZE),
+        payment_status: Optional[str] = None,
+        section: Optional[str] = None,
+        table_number: Optional[int] = None,
+        current_admin: UserSnapshot = Depends(get_current_admin),
         db: Session = Depends(get_db)
 ):
-    """Get all bookings"""
-    bookings = db.query(Booking).all()
-    return bookings
+    """Get bookings in id order, all of them or one page at a time
+
+    Without limit or after_id every booking is returned, as before paging
+    existed. With either, pages hold `limit` bookings (BOOKINGS_PAGE_SIZE by
+    default) and, when more follow, the X-Next-Cursor header holds the
+    after_id for the next page. Seat and table come from the same
+    column-only query.
+    """
+    query = booking_rows().order_by(Booking.id)
+    if limit is None and after_id is not None:
+        limit = BOOKINGS_PAGE_SIZE
+    if limit is not None:
+        query = query.limit(limit + 1)
+    if after_id is not None:
+        query = query.where(Booking.id > after_id)
+    if payment_status:
+        query = query.where(Booking.payment_status == payment_status)
+    if section:
+        query = query.where(Table.section == section)
+    if table_number is not None:
+        query = query.where(Table.table_number == table_number)
+
+    rows = db.execute(query).all()
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return fast_json.respond([booking_row_dict(row) for row in rows], response)
+
+@router.get("/bookings/export")
+def export_bookings(
+        format: str = Query("csv", pattern="^(csv|ndjson)$"),
+        payment_status: Optional[str] = None,
+        section: Optional[str] = None,
+        current_admin: UserSnapshot = Depends(get_current_admin)
+):
+    """Stream every booking with attendee, table and seat as CSV or NDJSON"""
+    query = export_query(payment_status=payment_status, section=section)
+    if format == "ndjson":
+        return StreamingResponse(
+            iter_ndjson(query),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": 'attachment; filename="bookings.ndjson"'}
+        )
+    return StreamingResponse(
+        iter_csv(query),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="bookings.csv"'}
+    )
 
 @router.delete("/tables/{table_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_table(
+def delete_table(
         table_id: int,
-        current_admin: User = Depends(get_current_admin),
+        current_admin: UserSnapshot = Depends(get_current_admin),
         db: Session = Depends(get_db)
 ):
     """Delete a table and its seats"""
@@ -199,5 +312,22 @@ async def delete_table(
 
     db.delete(table)
     db.commit()
+    seat_index.remove_table(table_id)
 
-    return None
\ No newline at end of file
+    return None
+
+@router.get("/profiles", response_model=List[dict])
+def get_request_profiles(current_admin: UserSnapshot = Depends(get_current_admin)):
+    """Stored request profiles, newest first (see utils/profiling.py)"""
+    return list_profiles()
+
+@router.get("/profiles/{profile_id}")
+def download_request_profile(
+        profile_id: str,
+        current_admin: UserSnapshot = Depends(get_current_admin)
+):
+    """Download a pstats (.prof) or folded-stacks (.folded) profile"""
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, filename=profile_id, media_type="application/octet-stream")
@@ -1,62 +1,68 @@
 """
-Router for serving HTML pages
+Router for serving HTML pages and static files
+
+Pages are rendered once and served from memory (see utils/site_assets.py)
 """
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Request, status
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-import os
+from app.core.utils.site_assets import site_assets
 
 router = APIRouter(tags=["Pages"])
 
-# Setup templates directory
-templates = Jinja2Templates(directory="app/templates")
-
 @router.get("/", response_class=HTMLResponse)
 async def home_page(request: Request):
     """Landing page"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    return site_assets.page(request, "index.html")
 
 @router.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
     """Login page for both students and admins"""
-    return templates.TemplateResponse("login.html", {"request": request})
+    return site_assets.page(request, "login.html")
 
 @router.get("/register", response_class=HTMLResponse)
 async def register_page(request: Request):
     """Student registration page"""
-    return templates.TemplateResponse("register.html", {"request": request})
+    return site_assets.page(request, "register.html")
 
 @router.get("/student/dashboard", response_class=HTMLResponse)
 async def student_dashboard_page(request: Request):
     """Student dashboard page"""
-    return templates.TemplateResponse("student_dashboard.html", {"request": request})
+    return site_assets.page(request, "student_dashboard.html")
 
 @router.get("/student/seating", response_class=HTMLResponse)
 async def student_seating_page(request: Request):
     """Interactive seating chart for students"""
-    return templates.TemplateResponse("student_seating.html", {"request": request})
+    return site_assets.page(request, "student_seating.html")
 
 @router.get("/student/booking", response_class=HTMLResponse)
 async def student_booking_page(request: Request):
     """Student booking details and payment page"""
-    return templates.TemplateResponse("student_booking.html", {"request": request})
+    return site_assets.page(request, "student_booking.html")
 
 @router.get("/admin/dashboard", response_class=HTMLResponse)
 async def admin_dashboard_page(request: Request):
     """Admin dashboard page"""
-    return templates.TemplateResponse("admin_dashboard.html", {"request": request})
+    return site_assets.page(request, "admin_dashboard.html")
 
 @router.get("/admin/seating", response_class=HTMLResponse)
 async def admin_seating_page(request: Request):
     """Admin seating management page"""
-    return templates.TemplateResponse("admin_seating.html", {"request": request})
+    return site_assets.page(request, "admin_seating.html")
 
 @router.get("/admin/users", response_class=HTMLResponse)
 async def admin_users_page(request: Request):
     """Admin user management page"""
-    return templates.TemplateResponse("admin_users.html", {"request": request})
+    return site_assets.page(request, "admin_users.html")
 
 @router.get("/admin/bookings", response_class=HTMLResponse)
 async def admin_bookings_page(request: Request):
     """Admin bookings overview page"""
-    return templates.TemplateResponse("admin_bookings.html", {"request": request})
\ No newline at end of file
+    return site_assets.page(request, "admin_bookings.html")
+
+@router.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def static_file(request: Request, path: str):
+    """Files under app/static, by plain or content-hashed name"""
+    response = site_assets.static(request, path)
+    if response is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return response
@@ -1,66 +1,78 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import datetime
-from app.core.dependencies.database import get_db
-from app.core.schemas.schemas import PaymentRequest, BookingResponse
-from app.core.models.user import User
-from app.core.models.seating import Booking, Seat, SeatStatus
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.dependencies.database import get_async_db
+from app.core.schemas.schemas import PaymentRequest, PaymentStatus, BookingResponse
+from app.core.models.seating import Booking, PaymentOutbox
+from app.core.utils.booking_queries import booking_with_seat, user_is_active
+from app.core.utils.token_cache import UserSnapshot
 from app.core.utils.auth import get_current_active_user
-import uuid
+from app.core.utils.waiting_room import require_admission
+from app.core.utils.metrics import payment_outcomes_total
+from app.core.utils.payment_outbox import PAYMENT_POLL_SECONDS, payment_workers
+from app.core.utils.seat_index import seat_index
 
-router = APIRouter(prefix="/api/payment", tags=["Payment"])
+# Behind the waiting room while it is enabled
+router = APIRouter(prefix="/api/payment", tags=["Payment"], dependencies=[Depends(require_admission)])
 
-@router.post("/process", response_model=BookingResponse)
+@router.post("/process", response_model=BookingResponse, status_code=status.HTTP_202_ACCEPTED)
 async def process_payment(
         payment_data: PaymentRequest,
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        response: Response,
+        current_user: UserSnapshot = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_async_db)
 ):
-    """Process payment for a booking"""
+    """Queue payment for a booking; poll /api/payment/status/{booking_id} for the outcome"""
 
     # Get the booking
-    booking = db.query(Booking).filter(
+    booking = await db.scalar(booking_with_seat().where(
         Booking.id == payment_data.booking_id,
         Booking.user_id == current_user.id
-    ).first()
+    ))
 
     if not booking:
+        payment_outcomes_total.inc("not_found")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Booking not found"
         )
 
     if booking.payment_status == "completed":
+        payment_outcomes_total.inc("already_paid")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Payment already completed"
         )
 
-    # TODO: Integrate with actual payment gateway (Stripe, PayPal, etc.)
-    # For now, simulate payment processing
-    payment_success = process_payment_gateway(
-        payment_data.payment_method,
-        payment_data.payment_token,
-        booking.payment_amount
-    )
-
-    if not payment_success:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Payment processing failed"
+    if booking.payment_status != "processing":
+        # Conditional switch to "processing": of concurrent requests only one records a charge
+        switched = await db.execute(
+            update(Booking)
+            .where(
+                Booking.id == booking.id,
+                Booking.payment_status == booking.payment_status,
+                user_is_active(current_user.id)
+            )
+            .values(payment_status="processing")
         )
-
-    # Update booking
-    booking.payment_status = "completed"
-    booking.payment_date = datetime.utcnow()
-    booking.payment_transaction_id = str(uuid.uuid4())
-
-    # Update seat status to reserved
-    seat = db.query(Seat).filter(Seat.id == booking.seat_id).first()
-    seat.status = SeatStatus.RESERVED
-
-    db.commit()
-    db.refresh(booking)
+        if switched.rowcount != 1 and not await db.scalar(select(user_is_active(current_user.id))):
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+        if switched.rowcount == 1:
+            entry = PaymentOutbox(
+                booking_id=booking.id,
+                payment_method=payment_data.payment_method,
+                payment_token=payment_data.payment_token,
+                amount=booking.payment_amount
+            )
+            db.add(entry)
+            await db.commit()
+            seat_index.touch_booking(current_user.id)
+            payment_workers.submit(entry.id)
+            payment_outcomes_total.inc("queued")
+        booking.payment_status = "processing"  # the charge is queued either way
+
+    response.headers["Location"] = f"/api/payment/status/{booking.id}"
 
     # Populate table_number for response
     if booking.seat and booking.seat.table:
@@ -68,18 +80,57 @@ async def process_payment(
 
     return booking
 
+@router.get("/status/{booking_id}", response_model=PaymentStatus)
+async def get_payment_status(
+        booking_id: int,
+        current_user: UserSnapshot = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Payment state of a booking, polled after /process (one query unless the payment failed)"""
+
+    booking = (await db.execute(
+        select(Booking.payment_status, Booking.payment_transaction_id, Booking.payment_date).where(
+            Booking.id == booking_id,
+            Booking.user_id == current_user.id
+        )
+    )).first()
+
+    if not booking:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Booking not found"
+        )
+
+    detail = None
+    if booking.payment_status == "failed":
+        detail = await db.scalar(
+            select(PaymentOutbox.error)
+            .where(PaymentOutbox.booking_id == booking_id)
+            .order_by(PaymentOutbox.id.desc())
+            .limit(1)
+        )
+
+    return PaymentStatus(
+        booking_id=booking_id,
+        payment_status=booking.payment_status,
+        transaction_id=booking.payment_transaction_id,
+        payment_date=booking.payment_date,
+        detail=detail,
+        poll_after_seconds=PAYMENT_POLL_SECONDS if booking.payment_status == "processing" else None
+    )
+
 @router.get("/confirmation/{booking_id}", response_model=dict)
 async def get_payment_confirmation(
         booking_id: int,
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        current_user: UserSnapshot = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Get payment confirmation details"""
 
-    booking = db.query(Booking).filter(
+    booking = await db.scalar(booking_with_seat().where(
         Booking.id == booking_id,
         Booking.user_id == current_user.id
-    ).first()
+    ))
 
     if not booking:
         raise HTTPException(
@@ -99,26 +150,3 @@ async def get_payment_confirmation(
             "table_number": booking.seat.table.table_number
         }
     }
-
-def process_payment_gateway(method: str, token: str, amount: float) -> bool:
-    """
-    Simulate payment processing with external gateway
-    In production, integrate with Stripe, PayPal, Square, etc.
-    """
-    # Placeholder for payment gateway integration
-    # Example with Stripe:
-    # import stripe
-    # stripe.api_key = "your_stripe_secret_key"
-    # try:
-    #     charge = stripe.Charge.create(
-    #         amount=int(amount * 100),  # Convert to cents
-    #         currency="usd",
-    #         source=token,
-    #         description="Prom Ticket Purchase"
-    #     )
-    #     return charge.paid
-    # except stripe.error.CardError:
-    #     return False
-
-    # For now, always return True (simulate successful payment)
-    return True
\ No newline at end of file
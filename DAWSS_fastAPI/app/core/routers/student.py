@@ -1,121 +1,301 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from typing import List
-from app.core.dependencies.database import get_db
+from typing import List, Optional, Tuple
+import base64
+import json
+from app.core.dependencies.database import AsyncSessionLocal, get_async_db
 from app.core.schemas.schemas import (
     TableResponse,
     BookingCreate,
     BookingResponse,
+    SeatChangesResponse,
     StudentDashboard
 )
 from app.core.models.user import User
-from app.core.models.seating import Table, Seat, Booking, SeatStatus
-from app.core.utils.auth import get_current_active_user
+from app.core.models.seating import Seat, Booking, SeatStatus
+from app.core.utils.booking_queries import booking_with_seat, booking_rows, booking_row_dict, user_is_active
+from app.core.utils.token_cache import UserSnapshot
+from app.core.utils.auth import get_current_active_user, get_current_user
+from app.core.utils.waiting_room import require_admission
+from app.core.utils.seat_index import seat_index, seat_claims, STATUS_CODES
+from app.core.utils.http_cache import etag_matches
+from app.core.utils.seat_broadcast import seat_broadcaster
+from app.core.utils import fast_json
+from app.core.utils.metrics import booking_conflicts_total
 
-router = APIRouter(prefix="/api/student", tags=["Student"])
+# Behind the waiting room while it is enabled
+router = APIRouter(prefix="/api/student", tags=["Student"], dependencies=[Depends(require_admission)])
+
+# Browsers must revalidate seat maps (If-None-Match) before reusing them
+SEAT_MAP_CACHE_CONTROL = "private, no-cache"
+# A layout requested by its tag (?v=) never changes, so it can be kept for good
+LAYOUT_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+# UserResponse fields, read as a row for the dashboard
+USER_PROFILE_COLUMNS = (User.id, User.email, User.full_name, User.student_id, User.role, User.is_active, User.created_at)
+
+# Status names by packed code; 255 means no seat has that id
+STATUS_NAMES = [s.value for s in sorted(STATUS_CODES, key=STATUS_CODES.get)]
+
+# Encoded layout document for the current layout tag
+_layout_body: Tuple[str, bytes] = ("", b"")
+
+def _encoded_layout() -> Tuple[str, bytes]:
+    global _layout_body
+    if _layout_body[0] != seat_index.layout_tag:
+        tag, tables = seat_index.layout()
+        document = {"layout_version": tag, "status_codes": STATUS_NAMES, "tables": tables}
+        _layout_body = (tag, json.dumps(document, separators=(",", ":")).encode())
+    return _layout_body
+
+def not_modified(request: Request, response: Response, etag: str):
+    """304 response if the client already has this version, else tag the response"""
+    headers = {"ETag": etag, "Cache-Control": SEAT_MAP_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
 
 @router.get("/dashboard", response_model=StudentDashboard)
 async def get_student_dashboard(
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        request: Request,
+        response: Response,
+        current_user: UserSnapshot = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_async_db)
 ):
-    """Get student dashboard with booking info and available tables"""
+    """Get student dashboard with booking info and available tables
 
-    # Get user's booking if exists
-    booking = db.query(Booking).filter(Booking.user_id == current_user.id).first()
+    Booking changes either change a seat status or bump the user's booking
+    version (payment state), so seat_index.user_etag identifies the whole
+    payload and a 304 needs no query.
+    """
+    await seat_index.ensure_fresh_async(db)
+    cached = not_modified(request, response, seat_index.user_etag(current_user.id))
+    if cached:
+        return cached
 
-    # Get all active tables with seats
-    tables = db.query(Table).filter(Table.is_active == True).all()
+    # Full profile for the response (the auth snapshot only carries id/role/is_active)
+    user = (await db.execute(select(*USER_PROFILE_COLUMNS).where(User.id == current_user.id))).one()
 
-    # Populate table_number for seats for UI convenience
-    for table in tables:
-        for seat in table.seats:
-            if seat.table and hasattr(seat, "table"):
-                setattr(seat, "table_number", seat.table.table_number)
+    # Get user's booking if exists
+    booking = (await db.execute(booking_rows().where(Booking.user_id == current_user.id))).first()
 
-    if booking and booking.seat and booking.seat.table:
-        setattr(booking.seat, "table_number", booking.seat.table.table_number)
+    # Get all active tables with seats from the availability index
+    tables = seat_index.tables()
 
-    return {
-        "user": current_user,
-        "booking": booking,
+    return fast_json.respond({
+        "user": user._asdict(),
+        "booking": booking_row_dict(booking) if booking else None,
         "available_tables": tables
-    }
+    }, response)
 
 @router.get("/tables", response_model=List[TableResponse])
 async def get_available_tables(
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        request: Request,
+        response: Response,
+        current_user: UserSnapshot = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Get all tables with seat availability"""
-    tables = db.query(Table).filter(Table.is_active == True).all()
-    # Populate table_number on seats
-    for table in tables:
-        for seat in table.seats:
-            if seat.table:
-                setattr(seat, "table_number", seat.table.table_number)
-    return tables
+    await seat_index.ensure_fresh_async(db)
+    cached = not_modified(request, response, seat_index.etag())
+    if cached:
+        return cached
+    return fast_json.respond(seat_index.tables(), response)
+
+@router.get("/seats/changes", response_model=SeatChangesResponse)
+async def get_seat_changes(
+        since: int = Query(..., ge=0, description="Seat-state version the client already has"),
+        epoch: Optional[str] = Query(None, description="Epoch returned with that version"),
+        current_user: UserSnapshot = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Seats changed since a version, or the full seat map if those changes are no longer kept"""
+    await seat_index.ensure_fresh_async(db)
+
+    delta = seat_index.changes_since(since) if epoch in (None, seat_index.epoch) else None
+    if delta is not None:
+        version, changes = delta
+        return fast_json.respond(
+            {"epoch": seat_index.epoch, "version": version, "snapshot": False, "changes": changes, "tables": None}
+        )
+
+    version, tables = seat_index.snapshot()
+    return fast_json.respond(
+        {"epoch": seat_index.epoch, "version": version, "snapshot": True, "changes": [], "tables": tables}
+    )
+
+@router.get("/seats/layout")
+async def get_seat_layout(
+        request: Request,
+        v: Optional[str] = Query(None, description="Layout version from /seats/status"),
+        current_user: UserSnapshot = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Tables with [seat id, seat number] pairs and no statuses
+
+    Pair it with /seats/status. Requested as ?v=<X-Layout-Version>, the
+    response is cacheable for good because a new layout gets a new tag.
+    """
+    await seat_index.ensure_fresh_async(db)
+    tag, body = _encoded_layout()
+    etag = f'"{tag}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": LAYOUT_CACHE_CONTROL if v == tag else SEAT_MAP_CACHE_CONTROL,
+        "X-Layout-Version": tag,
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+@router.get("/seats/status")
+async def get_packed_seat_status(
+        request: Request,
+        encoding: str = Query("binary", pattern="^(binary|base64)$"),
+        current_user: UserSnapshot = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Seat statuses packed one byte per seat id (byte i is seat i)
+
+    Codes index the layout's status_codes; 255 means there is no seat with
+    that id. X-Layout-Version names the layout the vector belongs to.
+    """
+    await seat_index.ensure_fresh_async(db)
+    version, tag, packed = seat_index.packed_statuses()
+    etag = seat_index.etag("packed", encoding, version=version)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": SEAT_MAP_CACHE_CONTROL,
+        "X-Seat-Epoch": seat_index.epoch,
+        "X-Seat-Version": str(version),
+        "X-Layout-Version": tag,
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if encoding == "base64":
+        return Response(base64.b64encode(packed), media_type="text/plain", headers=headers)
+    return Response(packed, media_type="application/octet-stream", headers=headers)
+
+@router.websocket("/seats/ws")
+async def seat_updates(websocket: WebSocket, token: str = Query(...)):
+    """Push seat changes as they happen
+
+    Browsers cannot set an Authorization header on WebSockets, so the access
+    token is passed as ?token=. Messages are JSON:
+        {"type": "hello" | "reload", "epoch", "version"}
+        {"type": "seats", "epoch", "version", "changes": [seat, ...]}
+    On "reload", or a gap in versions, fetch /seats/changes?since=<version>.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            user = await get_current_user(token=token, db=db)
+            await get_current_active_user(user)
+            await seat_index.ensure_fresh_async(db)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    subscriber = seat_broadcaster.subscribe()
+    if subscriber is None:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+    try:
+        await websocket.accept()
+        await websocket.send_json({"type": "hello", "epoch": seat_index.epoch, "version": seat_index.version})
+        await seat_broadcaster.serve(websocket, subscriber)
+    finally:
+        seat_broadcaster.unsubscribe(subscriber)
 
 @router.post("/book-seat", response_model=BookingResponse, status_code=status.HTTP_201_CREATED)
 async def book_seat(
         booking_data: BookingCreate,
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        current_user: UserSnapshot = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Book a seat for the current student"""
 
     # Check if user already has a booking
-    existing_booking = db.query(Booking).filter(Booking.user_id == current_user.id).first()
+    existing_booking = await db.scalar(select(Booking.id).where(Booking.user_id == current_user.id))
     if existing_booking:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You already have a booking. Cancel it first to book another seat."
         )
 
-    # Check if seat exists and is available
-    seat = db.query(Seat).filter(Seat.id == booking_data.seat_id).first()
-    if not seat:
+    # Fast-fail on missing or taken seats using the availability index
+    await seat_index.ensure_fresh_async(db)
+    seat_status = seat_index.status(booking_data.seat_id)
+    if seat_status is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Seat not found"
         )
 
-    if seat.status != SeatStatus.AVAILABLE:
+    if seat_status != SeatStatus.AVAILABLE:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Seat is not available. Current status: {seat.status}"
+            detail=f"Seat is not available. Current status: {seat_status}"
         )
 
-    # Create booking
-    ticket_price = 50.00  # Set your ticket price
-    new_booking = Booking(
-        user_id=current_user.id,
-        seat_id=seat.id,
-        payment_status="pending",
-        payment_amount=ticket_price
-    )
+    async with seat_claims.claim(booking_data.seat_id):
+        # Another request for this seat may have just won while we waited
+        if seat_index.status(booking_data.seat_id) != SeatStatus.AVAILABLE:
+            booking_conflicts_total.inc("claim")
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Seat was just taken by another user. Please pick a different seat."
+            )
 
-    # Update seat status to selected
-    seat.status = SeatStatus.SELECTED
+        # Claim the seat with a conditional UPDATE; only one concurrent request can win.
+        # It also rechecks the user, whose cached login may predate a removal or deactivation.
+        claimed = await db.execute(
+            update(Seat)
+            .where(Seat.id == booking_data.seat_id, Seat.status == SeatStatus.AVAILABLE, user_is_active(current_user.id))
+            .values(status=SeatStatus.SELECTED)
+        )
+        if claimed.rowcount != 1:
+            await db.rollback()
+            # Lost the race (or the index was stale); correct the index for this seat
+            current_status = await db.scalar(select(Seat.status).where(Seat.id == booking_data.seat_id))
+            if current_status == SeatStatus.AVAILABLE:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+            if current_status is None:
+                await db.run_sync(seat_index.reload)
+            else:
+                seat_index.set_status(booking_data.seat_id, current_status)
+            booking_conflicts_total.inc("update")
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Seat was just taken by another user. Please pick a different seat."
+            )
 
-    db.add(new_booking)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        # Likely seat_id uniqueness violation due to race
-        # Reset seat to AVAILABLE if no booking persisted for it
-        fresh = db.query(Booking).filter(Booking.seat_id == seat.id).first()
-        if not fresh:
-            seat.status = SeatStatus.AVAILABLE
-            db.commit()
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Seat was just taken by another user. Please pick a different seat."
+        # Create booking in the same transaction as the claim
+        ticket_price = 50.00  # Set your ticket price
+        new_booking = Booking(
+            user_id=current_user.id,
+            seat_id=booking_data.seat_id,
+            payment_status="pending",
+            payment_amount=ticket_price
         )
 
-    db.refresh(new_booking)
+        db.add(new_booking)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Rolling back also undoes the seat UPDATE, so no SELECTED seat is orphaned
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="You already have a booking. Cancel it first to book another seat."
+            )
+        seat_index.set_status(booking_data.seat_id, SeatStatus.SELECTED)
+
+    new_booking = await db.scalar(
+        booking_with_seat().where(Booking.id == new_booking.id).execution_options(populate_existing=True)
+    )
 
     # populate table_number for response
     if new_booking.seat and new_booking.seat.table:
@@ -125,15 +305,15 @@ async def book_seat(
 @router.delete("/cancel-booking/{booking_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def cancel_booking(
         booking_id: int,
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        current_user: UserSnapshot = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Cancel a booking (only if not paid)"""
 
-    booking = db.query(Booking).filter(
+    booking = await db.scalar(select(Booking).where(
         Booking.id == booking_id,
         Booking.user_id == current_user.id
-    ).first()
+    ))
 
     if not booking:
         raise HTTPException(
@@ -147,23 +327,33 @@ async def cancel_booking(
             detail="Cannot cancel a paid booking. Contact admin for refunds."
         )
 
+    if booking.payment_status == "processing":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Payment is being processed. Try again once it has finished."
+        )
+
     # Free up the seat
-    seat = db.query(Seat).filter(Seat.id == booking.seat_id).first()
+    seat = await db.get(Seat, booking.seat_id)
     seat.status = SeatStatus.AVAILABLE
 
-    db.delete(booking)
-    db.commit()
+    deleted = await db.execute(delete(Booking).where(Booking.id == booking.id, user_is_active(current_user.id)))
+    if deleted.rowcount != 1:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+    await db.commit()
+    seat_index.set_status(seat.id, SeatStatus.AVAILABLE)
 
     return None
 
 @router.get("/my-booking", response_model=BookingResponse)
 async def get_my_booking(
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        current_user: UserSnapshot = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user's booking details"""
 
-    booking = db.query(Booking).filter(Booking.user_id == current_user.id).first()
+    booking = await db.scalar(booking_with_seat().where(Booking.user_id == current_user.id))
 
     if not booking:
         raise HTTPException(
@@ -0,0 +1,61 @@
+"""
+Waiting room for the sale opening (see utils/waiting_room.py)
+
+Neither endpoint touches the database: the student is identified from the
+access token's signature and the ticket is checked by its own signature.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.core.schemas.schemas import WaitingRoomStatus
+from app.core.utils.auth import oauth2_scheme
+from app.core.utils.waiting_room import waiting_room, token_subject
+
+router = APIRouter(prefix="/api/waiting-room", tags=["Waiting Room"])
+
+MAX_POLL_SECONDS = 15.0
+
+def queue_status(ticket: str, student: str, number: int) -> dict:
+    if not waiting_room.enabled:
+        position, queue_pass = 0, waiting_room.issue_pass(student)
+    else:
+        position = waiting_room.position(number)
+        queue_pass = waiting_room.claim(student, number) if position == 0 else None
+        if position == 0 and queue_pass is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="This ticket's turn is over. Join again.",
+            )
+    eta = position / waiting_room.rate if waiting_room.rate > 0 else float(MAX_POLL_SECONDS)
+    return {
+        "ticket": ticket,
+        "position": position,
+        "admitted": position == 0,
+        "eta_seconds": round(eta, 1),
+        "poll_after_seconds": round(min(max(eta / 2, 1.0), MAX_POLL_SECONDS), 1),
+        "queue_pass": queue_pass,
+    }
+
+@router.post("/join", response_model=WaitingRoomStatus)
+async def join_waiting_room(token: str = Depends(oauth2_scheme)):
+    """Get a place in the queue (joining again keeps the same place until the ticket is used)"""
+    subject = token_subject(token)
+    if subject is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    ticket = waiting_room.join(subject)
+    student, number = waiting_room.read_ticket(ticket)
+    return queue_status(ticket, student, number)
+
+@router.get("/status", response_model=WaitingRoomStatus)
+async def get_waiting_room_status(ticket: str = Query(..., max_length=200)):
+    """Queue position for a ticket, plus a queue pass once it is admitted"""
+    parsed = waiting_room.read_ticket(ticket)
+    if parsed is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This ticket is not valid for the current queue. Join again.",
+        )
+    student, number = parsed
+    return queue_status(ticket, student, number)
@@ -98,6 +98,14 @@ class PaymentRequest(BaseModel):
     payment_method: str  # e.g., "credit_card", "stripe"
     payment_token: str
 
+class PaymentStatus(BaseModel):
+    booking_id: int
+    payment_status: str  # pending, processing, completed, failed
+    transaction_id: Optional[str] = None
+    payment_date: Optional[datetime] = None
+    detail: Optional[str] = None  # why the last attempt failed
+    poll_after_seconds: Optional[float] = None  # set while processing
+
 # Admin Schemas
 class AdminSeatUpdate(BaseModel):
     seat_id: int
@@ -107,16 +115,44 @@ class AdminAssignSeat(BaseModel):
     user_id: int
     seat_id: int
 
+# Seat Change Feed Schemas
+class SeatChange(BaseModel):
+    id: int
+    table_id: int
+    seat_number: Optional[int] = None
+    table_number: Optional[int] = None
+    status: Optional[SeatStatus] = None  # None when the seat was removed
+
+class SeatChangesResponse(BaseModel):
+    epoch: str
+    version: int
+    snapshot: bool  # True: tables holds the full seat map instead of changes
+    changes: List[SeatChange] = []
+    tables: Optional[List[TableResponse]] = None
+
 # Dashboard Schemas
 class StudentDashboard(BaseModel):
     user: UserResponse
     booking: Optional[BookingResponse] = None
     available_tables: List[TableResponse]
 
-class AdminDashboardStats(BaseModel):
+class AdminDashboardCounts(BaseModel):
     total_seats: int
     available_seats: int
     reserved_seats: int
     pending_payments: int
+    processing_payments: int  # charges queued on the payment workers
+    failed_payments: int  # declined; the student can pay again
     total_revenue: float
-    tables: List[TableResponse]
\ No newline at end of file
+
+class AdminDashboardStats(AdminDashboardCounts):
+    tables: List[TableResponse]
+
+# Waiting Room Schemas
+class WaitingRoomStatus(BaseModel):
+    ticket: str
+    position: int  # students still ahead; 0 once admitted
+    admitted: bool
+    eta_seconds: float
+    poll_after_seconds: float
+    queue_pass: Optional[str] = None  # send as X-Queue-Pass once admitted
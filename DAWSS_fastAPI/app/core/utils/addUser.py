@@ -2,7 +2,7 @@
 # NOTE: Requires SQLAlchemy to be installed and available in your environment.
 from app.core.dependencies.database import SessionLocal, Base, engine
 from app.core.models.user import User, UserRole
-from app.core.utils.auth import get_password_hash
+from app.core.utils.hashing import get_password_hash
 from sqlalchemy.orm import Session
 
 # -------------------
@@ -1,28 +1,43 @@
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.core.dependencies.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.dependencies.database import get_async_db
 import os
 from app.core.models.user import User, UserRole
+from app.core.utils.hashing import PASSWORD_HASH_RETRY_AFTER, HashingBusy, hashing_executor
+from app.core.utils.token_cache import UserSnapshot, token_cache
 
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-insecure-secret-change-me")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", str(60 * 24)))  # 24 hours
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
-# Password hashing
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+# Password hashing (off the event loop, for async routes)
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins in progress. Please try again shortly.",
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+    )
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await hashing_executor.verify(plain_password, hashed_password)
+    except HashingBusy:
+        raise _hashing_busy()
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_password_hash_async(password: str) -> str:
+    try:
+        return await hashing_executor.hash(password)
+    except HashingBusy:
+        raise _hashing_busy()
 
 # JWT Token functions
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -38,8 +53,14 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 # Authentication dependency
 async def get_current_user(
         token: str = Depends(oauth2_scheme),
-        db: Session = Depends(get_db)
-) -> User:
+        db: AsyncSession = Depends(get_async_db)
+) -> UserSnapshot:
+    # Tokens seen recently resolve without decoding or touching the database
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+
+    generation = token_cache.generation
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -53,13 +74,19 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+    row = (await db.execute(
+        select(User.id, User.role, User.is_active).where(User.email == email)
+    )).first()
+    if row is None:
         raise credentials_exception
+
+    user = UserSnapshot(id=row.id, role=row.role, is_active=row.is_active)
+    expires_at = payload.get("exp")
+    token_cache.put(token, user, expires_at - time.time() if expires_at else None, generation)
     return user
 
 # Admin-only dependency
-async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_admin(current_user: UserSnapshot = Depends(get_current_user)) -> UserSnapshot:
     # Ensure robust comparison against enum
     if current_user.role != UserRole.ADMIN and str(current_user.role).lower() != "admin":
         raise HTTPException(
@@ -69,7 +96,7 @@ async def get_current_admin(current_user: User = Depends(get_current_user)) -> U
     return current_user
 
 # Active user dependency
-async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: UserSnapshot = Depends(get_current_user)) -> UserSnapshot:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
\ No newline at end of file
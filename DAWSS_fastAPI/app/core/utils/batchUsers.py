@@ -0,0 +1,208 @@
+"""
+Set-based batch operations on many users at once
+Used by the --batch modes of removeUser and modCredentials
+
+Identifier files hold one email or student ID per line (blank lines and
+lines starting with # are ignored). For reset-password a second column may
+give each user's new password: ``student@school.com,newpassword``.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.dependencies.database import SessionLocal
+from app.core.models.user import User, UserRole
+from app.core.models.seating import Booking, Seat, SeatStatus
+from app.core.utils.hashing import PASSWORD_HASH_WORKERS, get_password_hash
+from app.core.utils.token_cache import bump_auth_epoch
+
+OPERATIONS = ("deactivate", "delete", "reset-password", "change-role")
+
+# Keep IN lists under SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+@dataclass
+class BatchPlan:
+    operation: str
+    user_ids: List[int] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    bookings: int = 0
+    paid_bookings: int = 0
+    seats_to_free: List[int] = field(default_factory=list)
+    passwords: Dict[int, str] = field(default_factory=dict)
+
+    def summary(self) -> str:
+        lines = [
+            f"Operation: {self.operation}",
+            f"  • Users matched: {len(self.user_ids)}",
+            f"  • Identifiers not found: {len(self.missing)}",
+        ]
+        if self.missing:
+            preview = ", ".join(self.missing[:10]) + (" ..." if len(self.missing) > 10 else "")
+            lines.append(f"      {preview}")
+        if self.operation in ("delete", "deactivate"):
+            lines.append(f"  • Bookings held by these users: {self.bookings} ({self.paid_bookings} paid)")
+            lines.append(f"  • Seats that will be freed: {len(self.seats_to_free)}")
+        return "\n".join(lines)
+
+def read_identifiers(path: str) -> Dict[str, Optional[str]]:
+    """Identifier -> optional password, in file order"""
+    entries: Dict[str, Optional[str]] = {}
+    with open(path, encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            identifier, _, password = (part.strip() for part in line.partition(","))
+            entries[identifier] = password or None
+    return entries
+
+def _chunks(items: List, size: int = CHUNK_SIZE) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _released_bookings(operation: str, user_ids: List[int]):
+    """Bookings the operation removes: all of them on delete, unpaid ones on deactivate"""
+    condition = Booking.user_id.in_(user_ids)
+    if operation == "deactivate":
+        condition = condition & (Booking.payment_status != "completed")
+    return condition
+
+def plan_batch(
+        db: Session,
+        entries: Dict[str, Optional[str]],
+        operation: str,
+        by_email: bool = True,
+        new_password: Optional[str] = None
+) -> BatchPlan:
+    """Resolve identifiers and count what the operation would touch (read-only)"""
+    if operation not in OPERATIONS:
+        raise ValueError(f"Invalid operation: {operation}. Choose from: {', '.join(OPERATIONS)}")
+
+    column = User.email if by_email else User.student_id
+    plan = BatchPlan(operation=operation)
+    identifiers = list(entries)
+    found: Dict[str, int] = {}
+    for chunk in _chunks(identifiers):
+        for user_id, identifier in db.execute(select(User.id, column).where(column.in_(chunk))):
+            found[str(identifier)] = user_id
+    plan.user_ids = sorted(set(found.values()))
+    plan.missing = [i for i in identifiers if i not in found]
+
+    if operation == "reset-password":
+        for identifier, user_id in found.items():
+            password = entries[identifier] or new_password
+            if not password:
+                raise ValueError(f"No new password given for {identifier}")
+            plan.passwords[user_id] = password
+
+    if operation in ("delete", "deactivate"):
+        for chunk in _chunks(plan.user_ids):
+            counts = db.execute(
+                select(func.count(Booking.id), func.count(Booking.id).filter(Booking.payment_status == "completed"))
+                .where(Booking.user_id.in_(chunk))
+            ).one()
+            plan.bookings += counts[0]
+            plan.paid_bookings += counts[1]
+            plan.seats_to_free.extend(
+                db.scalars(select(Booking.seat_id).where(_released_bookings(operation, chunk)))
+            )
+    return plan
+
+def _hash_passwords(passwords: Dict[int, str], workers: int) -> Dict[int, str]:
+    user_ids = list(passwords)
+    if len(user_ids) < 50:
+        return {uid: get_password_hash(passwords[uid]) for uid in user_ids}
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        hashes = pool.map(get_password_hash, [passwords[uid] for uid in user_ids], chunksize=16)
+        return dict(zip(user_ids, hashes))
+
+def execute_batch(
+        db: Session,
+        plan: BatchPlan,
+        new_role: Optional[str] = None,
+        workers: int = PASSWORD_HASH_WORKERS
+) -> int:
+    """Apply a plan in a single transaction; returns the number of users affected"""
+    if not plan.user_ids:
+        return 0
+    if plan.operation == "change-role" and new_role not in ("student", "admin"):
+        raise ValueError(f"Invalid role: {new_role}")
+
+    hashes = _hash_passwords(plan.passwords, workers) if plan.operation == "reset-password" else {}
+
+    try:
+        for chunk in _chunks(plan.user_ids):
+            if plan.operation in ("delete", "deactivate"):
+                # Free the seats first, then drop the bookings holding them
+                released = _released_bookings(plan.operation, chunk)
+                db.execute(
+                    update(Seat)
+                    .where(Seat.id.in_(select(Booking.seat_id).where(released)))
+                    .values(status=SeatStatus.AVAILABLE),
+                    execution_options={"synchronize_session": False}
+                )
+                db.execute(delete(Booking).where(released), execution_options={"synchronize_session": False})
+
+            if plan.operation == "delete":
+                db.execute(delete(User).where(User.id.in_(chunk)), execution_options={"synchronize_session": False})
+            elif plan.operation == "deactivate":
+                db.execute(
+                    update(User).where(User.id.in_(chunk)).values(is_active=False),
+                    execution_options={"synchronize_session": False}
+                )
+            elif plan.operation == "change-role":
+                role = UserRole.ADMIN if new_role == "admin" else UserRole.STUDENT
+                db.execute(
+                    update(User).where(User.id.in_(chunk)).values(role=role),
+                    execution_options={"synchronize_session": False}
+                )
+
+        if hashes:
+            # ORM bulk UPDATE by primary key (executemany)
+            db.execute(update(User), [{"id": uid, "hashed_password": h} for uid, h in hashes.items()])
+
+        bump_auth_epoch(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return len(plan.user_ids)
+
+def run_batch_cli(
+        path: str,
+        operation: str,
+        by_email: bool = True,
+        new_password: Optional[str] = None,
+        new_role: Optional[str] = None,
+        dry_run: bool = False,
+        assume_yes: bool = False
+) -> int:
+    """Print the dry-run summary, confirm, then apply the batch"""
+    db = SessionLocal()
+    try:
+        entries = read_identifiers(path)
+        plan = plan_batch(db, entries, operation, by_email=by_email, new_password=new_password)
+        print(plan.summary())
+
+        if dry_run:
+            print("\nDry run - no changes made")
+            return 0
+        if not plan.user_ids:
+            print("⚠ No matching users, nothing to do")
+            return 0
+        if not assume_yes:
+            confirm = input("\nProceed? (yes/no): ").strip().lower()
+            if confirm != "yes":
+                print("❌ Operation cancelled")
+                return 0
+
+        count = execute_batch(db, plan, new_role=new_role)
+        print(f"\n✅ {operation} applied to {count} users")
+        return count
+    finally:
+        db.close()
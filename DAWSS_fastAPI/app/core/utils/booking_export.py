@@ -0,0 +1,95 @@
+"""
+Streaming export of bookings (attendee lists for the door)
+
+Rows are fetched in batches from a server-side cursor and encoded as they
+arrive, so memory use does not depend on the number of bookings. The
+generators open their own session because they keep running after the
+request handler has returned.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Optional, Sequence
+
+from sqlalchemy import Select, select
+
+from app.core.dependencies.database import SessionLocal
+from app.core.models.user import User
+from app.core.models.seating import Booking, Seat, Table
+
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_COLUMNS = (
+    "booking_id",
+    "email",
+    "full_name",
+    "student_id",
+    "table_number",
+    "section",
+    "seat_number",
+    "payment_status",
+    "payment_amount",
+    "payment_date",
+)
+
+def export_query(payment_status: Optional[str] = None, section: Optional[str] = None) -> Select:
+    """Column-only select of one row per booking, in booking id order"""
+    query = (
+        select(
+            Booking.id,
+            User.email,
+            User.full_name,
+            User.student_id,
+            Table.table_number,
+            Table.section,
+            Seat.seat_number,
+            Booking.payment_status,
+            Booking.payment_amount,
+            Booking.payment_date,
+        )
+        .join(User, Booking.user_id == User.id)
+        .join(Seat, Booking.seat_id == Seat.id)
+        .join(Table, Seat.table_id == Table.id)
+        .order_by(Booking.id)
+    )
+    if payment_status:
+        query = query.where(Booking.payment_status == payment_status)
+    if section:
+        query = query.where(Table.section == section)
+    return query
+
+def stream_rows(query: Select, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Sequence]:
+    """Yield batches of rows from a server-side cursor"""
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            yield rows
+    finally:
+        db.close()
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def iter_csv(query: Select, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # Header goes out before the query runs
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    for rows in stream_rows(query, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_value(v) for v in row] for row in rows)
+        yield buffer.getvalue()
+
+def iter_ndjson(query: Select, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    for rows in stream_rows(query, batch_size):
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, (_value(v) for v in row)))) + "\n"
+            for row in rows
+        )
@@ -0,0 +1,59 @@
+"""
+Booking queries shared by the student, payment and admin routes
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from app.core.models.seating import Booking, Seat, Table
+from app.core.models.user import User
+
+
+def booking_with_seat():
+    """Select bookings with seat and table eager-loaded (async sessions cannot lazy load)"""
+    return select(Booking).options(joinedload(Booking.seat).joinedload(Seat.table))
+
+
+def user_is_active(user_id: int):
+    """EXISTS clause for write guards: cached logins can outlive a removal or deactivation"""
+    return select(User.id).where(User.id == user_id, User.is_active.is_(True)).exists()
+
+
+def booking_rows():
+    """Column-only select of bookings joined to seat and table (see booking_row_dict)"""
+    return (
+        select(
+            Booking.id,
+            Booking.user_id,
+            Booking.seat_id,
+            Booking.payment_status,
+            Booking.payment_amount,
+            Booking.booking_date,
+            Booking.payment_date,
+            Seat.seat_number,
+            Seat.table_id,
+            Seat.status,
+            Table.table_number,
+        )
+        .join(Seat, Booking.seat_id == Seat.id)
+        .join(Table, Seat.table_id == Table.id)
+    )
+
+
+def booking_row_dict(row) -> dict:
+    """Shape a booking_rows() row like BookingResponse"""
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "seat_id": row.seat_id,
+        "payment_status": row.payment_status,
+        "payment_amount": row.payment_amount,
+        "booking_date": row.booking_date,
+        "payment_date": row.payment_date,
+        "seat": {
+            "id": row.seat_id,
+            "seat_number": row.seat_number,
+            "table_id": row.table_id,
+            "status": row.status,
+            "table_number": row.table_number,
+        },
+    }
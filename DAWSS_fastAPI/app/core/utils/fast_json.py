@@ -0,0 +1,47 @@
+"""
+Opt-in fast JSON responses
+
+With FAST_JSON=1 the read-only endpoints that return large seat maps send
+their payload as an ORJSONResponse. Returning a response object skips
+FastAPI's response_model validation and jsonable_encoder pass, so those
+endpoints build plain dicts already shaped like their response model (from
+the seat index or from column-only queries). With the flag off, or without
+orjson installed, the same dicts go through the normal validated path.
+"""
+import os
+from typing import Optional
+
+from fastapi import Response
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse
+except ImportError:  # optional dependency
+    orjson = None
+    ORJSONResponse = None
+
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+
+
+def enabled() -> bool:
+    return FAST_JSON and orjson is not None
+
+def respond(content, response: Optional[Response] = None, status_code: int = 200):
+    """
+    Send content through orjson when the fast path is on
+
+    Args:
+        content: Dicts/lists shaped exactly like the route's response_model
+        response: The route's injected Response; its headers (ETag,
+            X-Next-Cursor, ...) are copied because FastAPI only applies them
+            to responses it builds itself
+
+    Returns:
+        An ORJSONResponse, or content unchanged for FastAPI to validate
+    """
+    if not enabled():
+        return content
+    headers = None
+    if response is not None:
+        headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
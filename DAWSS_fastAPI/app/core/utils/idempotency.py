@@ -0,0 +1,204 @@
+"""
+Idempotency keys for booking and payment
+
+A client may send an Idempotency-Key header with POST /api/student/book-seat
+and POST /api/payment/process. The first request with a key runs normally
+and its response is kept. Later requests from the same student with the
+same key get that response back (with Idempotent-Replayed: true) without
+running the route again. A duplicate that arrives while the first request
+is still running waits for it rather than starting a second transaction.
+
+Keys are scoped to the student (the access token's subject) and route.
+Reusing a key with a different request body gets a 422. 5xx, 429 and 503
+responses are not kept, so those can be retried with the same key. The
+store holds the IDEMPOTENCY_CACHE_SIZE most recent keys for
+IDEMPOTENCY_TTL_SECONDS each, in process memory.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from app.core.utils.metrics import Counter, registry
+from app.core.utils.waiting_room import token_subject
+
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENT_ROUTES = frozenset({
+    ("POST", "/api/student/book-seat"),
+    ("POST", "/api/payment/process"),
+})
+
+# Responses that say "try again" rather than describing the outcome
+UNCACHED_STATUSES = frozenset({429, 503})
+
+idempotent_replays_total = registry.register(Counter(
+    "idempotent_replays_total", "Requests answered from the Idempotency-Key store", ("route",)
+))
+
+
+@dataclass
+class StoredResponse:
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    route: Any = None  # the matched route, so replays are labelled like the original in metrics
+
+
+@dataclass
+class Entry:
+    fingerprint: str
+    expires: float
+    # Resolved with the response to replay, or None if it is not kept
+    done: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class IdempotencyStore:
+    """Recent keys and their responses, oldest evicted first"""
+
+    def __init__(self, max_entries: int = IDEMPOTENCY_CACHE_SIZE, ttl: float = IDEMPOTENCY_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, ...], Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def begin(self, key: Tuple[str, ...], fingerprint: str) -> Tuple[Entry, bool]:
+        """(entry, True) if this request should run, (existing entry, False) for a duplicate
+
+        Only called from the event loop, so no lock is needed.
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires > now:
+            return entry, False
+        entry = Entry(fingerprint=fingerprint, expires=now + self.ttl)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry, True
+
+    def finish(self, key: Tuple[str, ...], entry: Entry, response: Optional[StoredResponse]):
+        """Hand the response to waiting duplicates; forget the key if it is not kept"""
+        if response is None and self._entries.get(key) is entry:
+            del self._entries[key]
+        if not entry.done.done():
+            entry.done.set_result(response)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+class IdempotencyMiddleware:
+    """Answers duplicate Idempotency-Key requests from the store (pure ASGI)"""
+
+    def __init__(self, app, routes: FrozenSet[Tuple[str, str]] = IDEMPOTENT_ROUTES, store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.routes = routes
+        self.store = store or IdempotencyStore()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.routes:
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = _header(scope, b"idempotency-key")
+        scheme, _, token = (_header(scope, b"authorization") or "").partition(" ")
+        subject = token_subject(token) if idempotency_key and scheme.lower() == "bearer" else None
+        if subject is None:
+            await self.app(scope, receive, send)  # no key, or left to the route's own auth
+            return
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            await self._send_error(send, 400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+            return
+
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        key = (subject, scope["method"], scope["path"], idempotency_key)
+
+        while True:
+            entry, owner = self.store.begin(key, fingerprint)
+            if owner:
+                await self._run(scope, body, send, key, entry)
+                return
+            if entry.fingerprint != fingerprint:
+                await self._send_error(send, 422, "Idempotency-Key was already used with a different request")
+                return
+            stored = await asyncio.shield(entry.done)
+            if stored is not None:
+                idempotent_replays_total.inc(scope["path"])
+                if stored.route is not None:
+                    scope["route"] = stored.route
+                await self._replay(send, stored)
+                return
+            # The first attempt's response was not kept (e.g. 5xx): run this one ourselves
+
+    async def _run(self, scope, body: bytes, send, key, entry: Entry):
+        sent_body = False
+
+        async def replay_receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return {"type": "http.disconnect"}
+
+        start: Dict = {}
+        chunks: List[bytes] = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        stored = None
+        try:
+            await self.app(scope, replay_receive, capture)
+            status = start.get("status", 500)
+            if status < 500 and status not in UNCACHED_STATUSES:
+                stored = StoredResponse(status, list(start.get("headers", [])), b"".join(chunks), scope.get("route"))
+        finally:
+            self.store.finish(key, entry, stored)
+
+    @staticmethod
+    async def _replay(send, stored: StoredResponse):
+        await send({
+            "type": "http.response.start",
+            "status": stored.status,
+            "headers": stored.headers + [(b"idempotent-replayed", b"true")],
+        })
+        await send({"type": "http.response.body", "body": stored.body})
+
+    @staticmethod
+    async def _send_error(send, status: int, detail: str):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,156 @@
+"""
+Utility script to bulk import students from a CSV file
+Can be run from command line or imported
+
+CSV columns: email, name, student_id, password (header row required)
+"""
+import argparse
+import csv
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.core.dependencies.database import SessionLocal, Base, engine
+from app.core.models.user import User, UserRole
+from app.core.utils.hashing import PASSWORD_HASH_WORKERS, get_password_hash
+
+REQUIRED_COLUMNS = ("email", "name", "student_id", "password")
+
+def read_csv(path: str) -> List[Dict[str, str]]:
+    """Read and validate the CSV, dropping rows duplicated within the file"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+
+        rows = []
+        seen_emails, seen_ids = set(), set()
+        for line, row in enumerate(reader, start=2):
+            row = {c: (row[c] or "").strip() for c in REQUIRED_COLUMNS}
+            row["email"] = row["email"].lower()
+            if not all(row[c] for c in ("email", "name", "password")):
+                raise ValueError(f"Line {line}: email, name and password are required")
+            if row["email"] in seen_emails or (row["student_id"] and row["student_id"] in seen_ids):
+                print(f"⚠ Line {line}: duplicate of an earlier row, skipped")
+                continue
+            seen_emails.add(row["email"])
+            if row["student_id"]:
+                seen_ids.add(row["student_id"])
+            rows.append(row)
+        return rows
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def find_existing(db: Session):
+    """All registered emails and student IDs, fetched with a single query"""
+    existing_emails, existing_ids = set(), set()
+    for email, student_id in db.execute(select(User.email, User.student_id)):
+        existing_emails.add(email.lower())
+        if student_id:
+            existing_ids.add(str(student_id))
+    return existing_emails, existing_ids
+
+def import_users(
+        path: str,
+        workers: int = PASSWORD_HASH_WORKERS,
+        chunk_size: int = 1000,
+        dry_run: bool = False,
+        db: Session = None
+) -> int:
+    """
+    Import students from a CSV file
+
+    Args:
+        path: CSV file with email, name, student_id, password columns
+        workers: Processes used for password hashing
+        chunk_size: Rows inserted per transaction
+        dry_run: Only report what would be imported
+        db: Database session (optional)
+
+    Returns:
+        Number of users inserted
+    """
+    should_close = False
+    if db is None:
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        should_close = True
+
+    try:
+        started = time.perf_counter()
+        rows = read_csv(path)
+        existing_emails, existing_ids = find_existing(db)
+        new_rows = [
+            r for r in rows
+            if r["email"] not in existing_emails and r["student_id"] not in existing_ids
+        ]
+        print(f"Read {len(rows)} rows: {len(new_rows)} new, {len(rows) - len(new_rows)} already registered")
+
+        if dry_run or not new_rows:
+            return 0
+
+        hash_started = time.perf_counter()
+        passwords = [r["password"] for r in new_rows]
+        workers = max(1, workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            hashes = list(pool.map(get_password_hash, passwords, chunksize=max(1, len(passwords) // (workers * 8))))
+        hash_elapsed = time.perf_counter() - hash_started
+        print(f"✓ Hashed {len(hashes)} passwords in {hash_elapsed:.1f}s ({len(hashes) / hash_elapsed:.0f} rows/sec)")
+
+        insert_started = time.perf_counter()
+        values = [
+            {
+                "email": r["email"],
+                "full_name": r["name"],
+                "student_id": r["student_id"] or None,
+                "hashed_password": hashed,
+                "role": UserRole.STUDENT,
+                "is_active": True,
+            }
+            for r, hashed in zip(new_rows, hashes)
+        ]
+        for chunk in _chunks(values, chunk_size):
+            db.execute(insert(User), chunk)  # executemany
+            db.commit()
+        insert_elapsed = time.perf_counter() - insert_started
+        print(f"✓ Inserted {len(values)} users in {insert_elapsed:.1f}s ({len(values) / insert_elapsed:.0f} rows/sec)")
+
+        total = time.perf_counter() - started
+        print(f"\n✅ Imported {len(values)} users in {total:.1f}s ({len(values) / total:.0f} rows/sec overall)")
+        return len(values)
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error importing users: {e}")
+        raise
+
+    finally:
+        if should_close:
+            db.close()
+
+def main():
+    """Command line interface for importing users"""
+    parser = argparse.ArgumentParser(description="Bulk import students from a CSV file")
+    parser.add_argument("csv_file", help="CSV with columns: email, name, student_id, password")
+    parser.add_argument("--workers", type=int, default=PASSWORD_HASH_WORKERS, help="password hashing processes")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="rows per insert transaction")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be imported")
+    args = parser.parse_args()
+
+    try:
+        import_users(args.csv_file, workers=args.workers, chunk_size=args.chunk_size, dry_run=args.dry_run)
+    except KeyboardInterrupt:
+        print("\n\n⚠ Operation cancelled")
+    except Exception as e:
+        print(f"\n❌ Failed to import users: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Venue layout import
+Can be run from command line or imported
+
+A layout is a list of tables (table_number, capacity, section, position_x,
+position_y) given as JSON or CSV. The whole layout is validated before
+anything is written, then tables and seats are written with bulk statements
+in a single transaction.
+
+Modes:
+    replace: drop every table and seat and build the layout from scratch
+             (refused while any booking exists)
+    merge:   match tables by table_number; add new ones, update changed
+             fields and add/remove trailing seats. Tables missing from the
+             layout are left alone.
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Set
+
+from pydantic import ValidationError
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.dependencies.database import SessionLocal, Base, engine
+from app.core.models.user import User  # noqa: F401 - Booking.user needs the mapper registered
+from app.core.models.seating import Table, Seat, Booking, SeatStatus
+from app.core.schemas.schemas import TableCreate
+
+MODES = ("merge", "replace")
+MAX_TABLE_CAPACITY = 50
+LAYOUT_FIELDS = ("table_number", "capacity", "section", "position_x", "position_y")
+
+
+class LayoutError(ValueError):
+    """Raised when a layout fails validation; holds every problem found"""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__("; ".join(errors))
+
+
+@dataclass
+class LayoutResult:
+    mode: str
+    tables_created: int = 0
+    tables_updated: int = 0
+    tables_removed: int = 0
+    seats_created: int = 0
+    seats_removed: int = 0
+    warnings: List[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        return (
+            f"{self.mode}: {self.tables_created} tables created, {self.tables_updated} updated, "
+            f"{self.tables_removed} removed; {self.seats_created} seats created, {self.seats_removed} removed"
+        )
+
+
+# -------------------
+# Parsing and validation
+# -------------------
+def parse_layout(content: str, fmt: str) -> List[dict]:
+    """Raw table rows from JSON (a list, or {"tables": [...]}) or CSV with a header row"""
+    if fmt == "json":
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data.get("tables")
+        if not isinstance(data, list):
+            raise LayoutError(["JSON layout must be a list of tables or {\"tables\": [...]}"])
+        return data
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(content))
+        missing = [c for c in ("table_number", "capacity") if c not in (reader.fieldnames or [])]
+        if missing:
+            raise LayoutError([f"CSV is missing columns: {', '.join(missing)}"])
+        return [
+            {k: (v.strip() or None) if isinstance(v, str) else v for k, v in row.items() if k in LAYOUT_FIELDS}
+            for row in reader
+        ]
+    raise LayoutError([f"Unknown layout format: {fmt}"])
+
+def validate_layout(rows: List[dict]) -> List[TableCreate]:
+    """Validate every row and the layout as a whole, reporting all problems at once"""
+    errors = []
+    tables = []
+    seen: Set[int] = set()
+    for position, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append(f"Row {position}: expected an object")
+            continue
+        try:
+            table = TableCreate(**{k: row.get(k) for k in LAYOUT_FIELDS if row.get(k) is not None})
+        except ValidationError as e:
+            problems = ", ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            errors.append(f"Row {position}: {problems}")
+            continue
+        if table.table_number < 1:
+            errors.append(f"Row {position}: table_number must be positive")
+        if not 1 <= table.capacity <= MAX_TABLE_CAPACITY:
+            errors.append(f"Row {position}: capacity must be between 1 and {MAX_TABLE_CAPACITY}")
+        if table.table_number in seen:
+            errors.append(f"Row {position}: duplicate table_number {table.table_number}")
+        seen.add(table.table_number)
+        tables.append(table)
+
+    if not rows:
+        errors.append("Layout has no tables")
+    if errors:
+        raise LayoutError(errors)
+    return tables
+
+
+# -------------------
+# Writing
+# -------------------
+def _insert_tables(db: Session, tables: List[TableCreate], result: LayoutResult):
+    if not tables:
+        return
+    db.execute(insert(Table), [{**t.model_dump(), "is_active": True} for t in tables])
+    numbers = [t.table_number for t in tables]
+    ids = dict(db.execute(select(Table.table_number, Table.id).where(Table.table_number.in_(numbers))).all())
+    seats = [
+        {"table_id": ids[t.table_number], "seat_number": n, "status": SeatStatus.AVAILABLE}
+        for t in tables
+        for n in range(1, t.capacity + 1)
+    ]
+    if seats:  # every new table may have capacity 0
+        db.execute(insert(Seat), seats)
+    result.tables_created += len(tables)
+    result.seats_created += len(seats)
+
+def _replace(db: Session, tables: List[TableCreate], result: LayoutResult):
+    bookings = db.scalar(select(func.count(Booking.id)))
+    if bookings:
+        raise LayoutError([f"Cannot replace the layout while {bookings} bookings exist; use merge mode"])
+    result.seats_removed = db.execute(delete(Seat)).rowcount
+    result.tables_removed = db.execute(delete(Table)).rowcount
+    _insert_tables(db, tables, result)
+
+def _merge(db: Session, tables: List[TableCreate], result: LayoutResult):
+    existing = {
+        row.table_number: row
+        for row in db.execute(select(Table.id, *(getattr(Table, f) for f in LAYOUT_FIELDS)))
+    }
+    seat_numbers: Dict[int, Set[int]] = {}
+    for table_id, seat_number in db.execute(select(Seat.table_id, Seat.seat_number)):
+        seat_numbers.setdefault(table_id, set()).add(seat_number)
+    occupied: Dict[int, Set[int]] = {}
+    for table_id, seat_number in db.execute(
+        select(Seat.table_id, Seat.seat_number)
+        .outerjoin(Booking, Booking.seat_id == Seat.id)
+        .where((Seat.status != SeatStatus.AVAILABLE) | Booking.id.is_not(None))
+    ):
+        occupied.setdefault(table_id, set()).add(seat_number)
+
+    # Plan everything first so a conflict aborts before any write
+    errors, new_tables, table_updates, shrink, new_seats = [], [], [], [], []
+    for table in tables:
+        current = existing.get(table.table_number)
+        if current is None:
+            new_tables.append(table)
+            continue
+        changes = {f: getattr(table, f) for f in LAYOUT_FIELDS if getattr(table, f) != getattr(current, f)}
+        if changes:
+            table_updates.append({"id": current.id, **changes})
+        numbers = seat_numbers.get(current.id, set())
+        blocked = sorted(n for n in occupied.get(current.id, ()) if n > table.capacity)
+        if blocked:
+            errors.append(
+                f"Table {table.table_number}: seats {', '.join(map(str, blocked))} are booked or blocked "
+                f"and cannot be removed"
+            )
+        if any(n > table.capacity for n in numbers):
+            shrink.append((current.id, table.capacity))
+        new_seats.extend(
+            {"table_id": current.id, "seat_number": n, "status": SeatStatus.AVAILABLE}
+            for n in range(1, table.capacity + 1) if n not in numbers
+        )
+    if errors:
+        raise LayoutError(errors)
+
+    if table_updates:
+        db.execute(update(Table), table_updates)  # bulk UPDATE by primary key
+        result.tables_updated = len(table_updates)
+    for table_id, capacity in shrink:
+        result.seats_removed += db.execute(
+            delete(Seat).where(Seat.table_id == table_id, Seat.seat_number > capacity)
+        ).rowcount
+    if new_seats:
+        db.execute(insert(Seat), new_seats)
+        result.seats_created += len(new_seats)
+    _insert_tables(db, new_tables, result)
+
+    unlisted = len(set(existing) - {t.table_number for t in tables})
+    if unlisted:
+        result.warnings.append(f"{unlisted} existing tables are not in the layout and were left unchanged")
+
+def apply_layout(db: Session, tables: List[TableCreate], mode: str = "merge", dry_run: bool = False) -> LayoutResult:
+    """
+    Write a validated layout in a single transaction
+
+    Args:
+        db: Database session
+        tables: Output of validate_layout
+        mode: "merge" or "replace"
+        dry_run: Roll back instead of committing
+
+    Returns:
+        Counts of what changed (or would change)
+
+    Raises:
+        LayoutError: If the layout conflicts with existing bookings
+    """
+    if mode not in MODES:
+        raise LayoutError([f"Invalid mode: {mode}. Choose from: {', '.join(MODES)}"])
+    result = LayoutResult(mode=mode)
+    try:
+        if mode == "replace":
+            _replace(db, tables, result)
+        else:
+            _merge(db, tables, result)
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return result
+
+def import_layout(content: str, fmt: str, mode: str = "merge", dry_run: bool = False, db: Session = None) -> LayoutResult:
+    """Parse, validate and apply a layout document"""
+    tables = validate_layout(parse_layout(content, fmt))
+
+    should_close = False
+    if db is None:
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        should_close = True
+    try:
+        return apply_layout(db, tables, mode=mode, dry_run=dry_run)
+    finally:
+        if should_close:
+            db.close()
+
+def main():
+    """Command line interface for importing a layout"""
+    parser = argparse.ArgumentParser(description="Import the venue layout (tables and seats)")
+    parser.add_argument("layout_file", help="JSON or CSV with table_number, capacity, section, position_x, position_y")
+    parser.add_argument("--mode", choices=MODES, default="merge")
+    parser.add_argument("--format", choices=("json", "csv"), help="defaults to the file extension")
+    parser.add_argument("--dry-run", action="store_true", help="validate and report without saving")
+    args = parser.parse_args()
+
+    fmt = args.format or ("json" if args.layout_file.lower().endswith(".json") else "csv")
+    try:
+        with open(args.layout_file, encoding="utf-8-sig") as f:
+            result = import_layout(f.read(), fmt, mode=args.mode, dry_run=args.dry_run)
+        for warning in result.warnings:
+            print(f"⚠ {warning}")
+        print(("Dry run - " if args.dry_run else "✅ ") + result.summary())
+    except LayoutError as e:
+        print("❌ Invalid layout:")
+        for error in e.errors:
+            print(f"  • {error}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ Failed to import layout: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
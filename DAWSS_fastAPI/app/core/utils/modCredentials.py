@@ -2,11 +2,14 @@
 Utility script to modify user credentials
 Can be run from command line or imported
 """
+import argparse
 import sys
 from sqlalchemy.orm import Session
 from app.core.dependencies.database import SessionLocal
 from app.core.models.user import User, UserRole
-from app.core.utils.auth import get_password_hash
+from app.core.utils.hashing import get_password_hash
+from app.core.utils.token_cache import bump_auth_epoch
+from app.core.utils.batchUsers import run_batch_cli
 
 def modify_user(
         identifier: str,
@@ -104,6 +107,7 @@ def modify_user(
             print("⚠ No changes were made")
             return user
 
+        bump_auth_epoch(db)
         db.commit()
         db.refresh(user)
 
@@ -151,6 +155,38 @@ def toggle_active_status(identifier: str, by_email: bool = True, db: Session = N
 
 def main():
     """Command line interface for modifying credentials"""
+    parser = argparse.ArgumentParser(description="Modify users (interactive unless --batch is given)")
+    parser.add_argument("--batch", metavar="FILE", help="file with one email or student ID per line")
+    parser.add_argument("--op", choices=["deactivate", "reset-password", "change-role"], help="batch operation")
+    parser.add_argument("--by", choices=["email", "id"], default="email", help="identifier type in the file")
+    parser.add_argument("--password", help="new password for reset-password (unless given per line)")
+    parser.add_argument("--role", choices=["student", "admin"], help="new role for change-role")
+    parser.add_argument("--dry-run", action="store_true", help="only print the summary")
+    parser.add_argument("--yes", action="store_true", help="skip the confirmation prompt")
+    args = parser.parse_args()
+
+    if args.batch:
+        if not args.op:
+            parser.error("--op is required with --batch")
+        if args.op == "change-role" and not args.role:
+            parser.error("--role is required for change-role")
+        try:
+            run_batch_cli(
+                args.batch,
+                args.op,
+                by_email=args.by == "email",
+                new_password=args.password,
+                new_role=args.role,
+                dry_run=args.dry_run,
+                assume_yes=args.yes
+            )
+        except KeyboardInterrupt:
+            print("\n\n⚠ Operation cancelled")
+        except Exception as e:
+            print(f"\n❌ Failed to modify users: {e}")
+            sys.exit(1)
+        return
+
     print("=== Modify User Credentials ===\n")
 
     try:
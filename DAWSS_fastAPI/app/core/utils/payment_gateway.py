@@ -0,0 +1,71 @@
+"""
+Payment gateway client
+
+Only a local stub exists for now: it sleeps for PAYMENT_GATEWAY_LATENCY_MS
+(plus up to PAYMENT_GATEWAY_JITTER_MS) and declines a PAYMENT_GATEWAY_FAILURE_RATE
+share of charges at random, so the payment workers can be load-tested
+against a realistic gateway. The token "tok_decline" is always declined.
+
+A real gateway replaces StubGateway.charge with a blocking SDK call; it runs
+on a payment worker thread, never on the event loop. Pass idempotency_key
+through to the gateway so a charge retried after a crash is not taken twice:
+
+    import stripe
+    charge = stripe.Charge.create(
+        amount=int(amount * 100),  # cents
+        currency="usd",
+        source=token,
+        description="Prom Ticket Purchase",
+        idempotency_key=idempotency_key,
+    )
+    return GatewayResult(approved=charge.paid, transaction_id=charge.id)
+"""
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+PAYMENT_GATEWAY_LATENCY_MS = float(os.getenv("PAYMENT_GATEWAY_LATENCY_MS", "200"))
+PAYMENT_GATEWAY_JITTER_MS = float(os.getenv("PAYMENT_GATEWAY_JITTER_MS", "100"))
+PAYMENT_GATEWAY_FAILURE_RATE = float(os.getenv("PAYMENT_GATEWAY_FAILURE_RATE", "0"))
+
+DECLINED_TOKEN = "tok_decline"
+
+
+@dataclass
+class GatewayResult:
+    approved: bool
+    transaction_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class StubGateway:
+    """Stands in for Stripe/PayPal/Square with configurable latency and declines"""
+
+    def __init__(
+            self,
+            latency_ms: float = PAYMENT_GATEWAY_LATENCY_MS,
+            jitter_ms: float = PAYMENT_GATEWAY_JITTER_MS,
+            failure_rate: float = PAYMENT_GATEWAY_FAILURE_RATE,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._charged = {}  # idempotency key -> result, like a real gateway's replay
+
+    def charge(self, method: str, token: str, amount: float, idempotency_key: str) -> GatewayResult:
+        """Blocking charge call"""
+        if idempotency_key in self._charged:
+            return self._charged[idempotency_key]
+        time.sleep((self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000)
+        if token == DECLINED_TOKEN or random.random() < self.failure_rate:
+            result = GatewayResult(approved=False, error="Payment was declined")
+        else:
+            result = GatewayResult(approved=True, transaction_id=f"stub_{uuid.uuid4().hex}")
+        self._charged[idempotency_key] = result
+        return result
+
+
+gateway = StubGateway()
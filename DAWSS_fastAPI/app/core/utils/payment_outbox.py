@@ -0,0 +1,210 @@
+"""
+Payment outbox workers
+
+POST /api/payment/process only switches the booking to "processing" and
+records a PaymentOutbox row in the same transaction, then answers 202. A
+pool of PAYMENT_WORKERS threads takes the rows, calls the gateway (a
+blocking call, so never on the event loop) and then, in one transaction,
+marks the booking completed and its seat RESERVED, or the booking failed so
+the student can try again. Clients poll /api/payment/status/{booking_id}.
+
+The outbox row is the source of truth, not the in-memory queue. At startup
+and then every PAYMENT_SWEEP_SECONDS, a sweep resubmits queued rows that no
+worker here has, and re-queues rows stuck in "sending" for
+PAYMENT_STUCK_SECONDS (the process died mid-charge). An attempt that raises
+(e.g. "database is locked") is logged, rolled back and put straight back in
+the queue for the next sweep. Each row is claimed with a conditional
+UPDATE, so several processes can share the table, and the outbox id is the
+gateway idempotency key, so a resent charge is not taken twice.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, Set
+
+from sqlalchemy import select, update
+
+from app.core.dependencies.database import SessionLocal
+from app.core.models.seating import Booking, OutboxStatus, PaymentOutbox, Seat, SeatStatus
+from app.core.utils.metrics import payment_outcomes_total
+from app.core.utils.payment_gateway import GatewayResult, gateway
+from app.core.utils.seat_index import seat_index
+
+PAYMENT_WORKERS = int(os.getenv("PAYMENT_WORKERS", "4"))  # concurrent gateway calls
+PAYMENT_STUCK_SECONDS = int(os.getenv("PAYMENT_STUCK_SECONDS", "300"))
+PAYMENT_POLL_SECONDS = float(os.getenv("PAYMENT_POLL_SECONDS", "1"))  # hint returned to polling clients
+PAYMENT_SWEEP_SECONDS = float(os.getenv("PAYMENT_SWEEP_SECONDS", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentWorkers:
+    """Bounded thread pool draining the payment outbox"""
+
+    def __init__(self, workers: int = PAYMENT_WORKERS, gateway=gateway, sweep_seconds: float = PAYMENT_SWEEP_SECONDS):
+        self.workers = max(1, workers)
+        self.gateway = gateway
+        self.sweep_seconds = sweep_seconds
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._submitted: Set[int] = set()  # outbox ids queued or running on this pool
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+
+    @property
+    def pending(self) -> int:
+        """Charges submitted to this process and not finished yet"""
+        return len(self._submitted)
+
+    def start(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="payment-worker")
+                self._stop.clear()
+                if self.sweep_seconds > 0:
+                    self._sweeper = threading.Thread(target=self._sweep, name="payment-sweeper", daemon=True)
+                    self._sweeper.start()
+        self.recover()
+
+    def stop(self):
+        """Let in-flight charges finish; queued rows stay in the outbox for the next start"""
+        self._stop.set()
+        with self._lock:
+            pool, self._pool = self._pool, None
+            sweeper, self._sweeper = self._sweeper, None
+        if sweeper is not None:
+            sweeper.join()
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            self._submitted.clear()
+
+    def submit(self, outbox_id: int):
+        """Queue a committed outbox row (the request path calls this after its commit)"""
+        with self._lock:
+            if self._pool is None or outbox_id in self._submitted:
+                return  # not started (the next sweep picks the row up), or already queued here
+            self._submitted.add(outbox_id)
+            self._pool.submit(self._run, outbox_id)
+
+    def _sweep(self):
+        while not self._stop.wait(self.sweep_seconds):
+            try:
+                self.recover()
+            except Exception:
+                logger.exception("Payment outbox sweep failed; retrying in %ss", self.sweep_seconds)
+
+    def recover(self) -> int:
+        """Resubmit queued rows and rows stuck in "sending"; returns how many rows were queued"""
+        stuck_before = datetime.utcnow() - timedelta(seconds=PAYMENT_STUCK_SECONDS)
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(PaymentOutbox)
+                .where(PaymentOutbox.status == OutboxStatus.SENDING, PaymentOutbox.updated_at < stuck_before)
+                .values(status=OutboxStatus.QUEUED)
+            )
+            db.commit()
+            ids = db.execute(
+                select(PaymentOutbox.id).where(PaymentOutbox.status == OutboxStatus.QUEUED).order_by(PaymentOutbox.id)
+            ).scalars().all()
+        finally:
+            db.close()
+        for outbox_id in ids:
+            self.submit(outbox_id)
+        return len(ids)
+
+    # -------------------
+    # Worker
+    # -------------------
+    def _run(self, outbox_id: int):
+        try:
+            self.process(outbox_id)
+        except Exception:
+            logger.exception("Payment outbox row %s failed; re-queued for the next sweep", outbox_id)
+            self._requeue(outbox_id)
+        finally:
+            with self._lock:
+                self._submitted.discard(outbox_id)
+
+    @staticmethod
+    def _requeue(outbox_id: int):
+        """Put a row whose attempt broke off back in the queue (the gateway replays a charge it already took)"""
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(PaymentOutbox)
+                .where(PaymentOutbox.id == outbox_id, PaymentOutbox.status == OutboxStatus.SENDING)
+                .values(status=OutboxStatus.QUEUED, updated_at=datetime.utcnow())
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Could not re-queue payment outbox row %s; it is retried after PAYMENT_STUCK_SECONDS", outbox_id)
+        finally:
+            db.close()
+
+    def process(self, outbox_id: int):
+        """Claim one outbox row, charge it and apply the result"""
+        db = SessionLocal()
+        try:
+            claimed = db.execute(
+                update(PaymentOutbox)
+                .where(PaymentOutbox.id == outbox_id, PaymentOutbox.status == OutboxStatus.QUEUED)
+                .values(status=OutboxStatus.SENDING, attempts=PaymentOutbox.attempts + 1, updated_at=datetime.utcnow())
+            ).rowcount
+            db.commit()
+            if not claimed:
+                return  # another worker or process has it
+            entry = db.get(PaymentOutbox, outbox_id)
+
+            try:
+                result = self.gateway.charge(
+                    entry.payment_method, entry.payment_token, entry.amount, idempotency_key=f"outbox-{outbox_id}"
+                )
+            except Exception as exc:  # network errors etc. end the attempt like a decline
+                result = GatewayResult(approved=False, error=f"Payment gateway error: {exc}")
+
+            booking = self._apply(db, entry, result)
+            changed = (booking.user_id, booking.seat_id) if booking is not None else None
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        if changed is not None:
+            user_id, seat_id = changed
+            if result.approved:
+                seat_index.set_status(seat_id, SeatStatus.RESERVED)
+            seat_index.touch_booking(user_id)  # a failed payment changes no seat
+        payment_outcomes_total.inc("completed" if result.approved else "failed")
+
+    @staticmethod
+    def _apply(db, entry: PaymentOutbox, result: GatewayResult) -> Optional[Booking]:
+        """Record the gateway's answer on the outbox row, booking and seat; the booking if it was updated"""
+        entry.payment_token = None
+        entry.transaction_id = result.transaction_id
+        entry.status = OutboxStatus.SUCCEEDED if result.approved else OutboxStatus.FAILED
+        entry.error = result.error
+
+        booking = db.get(Booking, entry.booking_id)
+        if booking is None or booking.payment_status != "processing":
+            if result.approved:
+                entry.error = "Booking removed while the payment was processing; refund this transaction"
+            return None
+        if not result.approved:
+            booking.payment_status = "failed"
+            return booking
+
+        booking.payment_status = "completed"
+        booking.payment_date = datetime.utcnow()
+        booking.payment_transaction_id = result.transaction_id
+        db.execute(update(Seat).where(Seat.id == booking.seat_id).values(status=SeatStatus.RESERVED))
+        return booking
+
+
+payment_workers = PaymentWorkers()
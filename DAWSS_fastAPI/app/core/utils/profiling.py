@@ -0,0 +1,228 @@
+"""
+On-demand request profiling for admins
+
+With PROFILING_ENABLED=1, an admin can profile a single request by adding
+the header X-Profile: cprofile|sample, or the query flag ?profile=cprofile|sample
+(the value 1 means cprofile). The response is served normally and gets an
+X-Profile-Id header; the profile is stored under PROFILE_DIR and can be
+downloaded from /api/admin/profiles/{id}.
+
+    cprofile  deterministic cProfile of the event-loop thread, saved as pstats
+              (.prof; open with snakeviz or python -m pstats). Covers async
+              routes; the body of a sync route runs in a worker thread and
+              shows up as the wait for it.
+    sample    stacks of the event loop and threadpool workers sampled every
+              PROFILE_SAMPLE_INTERVAL_MS, saved as folded stacks (.folded;
+              input for flamegraph.pl or speedscope). Covers sync routes too.
+
+Both see whatever else the process is doing at the same time. At most one
+request is profiled at a time and at most PROFILE_MAX_PER_MINUTE per
+process; past that the request just runs unprofiled (X-Profile: skipped),
+so the flag cannot be used to overload the server.
+"""
+import collections
+import cProfile
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from typing import Deque, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+
+from app.core.dependencies.database import AsyncSessionLocal
+from app.core.utils.auth import get_current_user, get_current_admin
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_MAX_PER_MINUTE = int(os.getenv("PROFILE_MAX_PER_MINUTE", "6"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "prom_profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))  # newest files kept on disk
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+
+MODES = {"1": "cprofile", "cprofile": "cprofile", "sample": "sample"}
+EXTENSIONS = {"cprofile": ".prof", "sample": ".folded"}
+PROFILE_ID = re.compile(r"^[0-9]+-[a-z]+-[A-Za-z0-9_.-]+\.(prof|folded)$")
+
+
+class ProfileBudget:
+    """One profile at a time, at most `per_minute` per rolling minute"""
+
+    def __init__(self, per_minute: int = PROFILE_MAX_PER_MINUTE):
+        self.per_minute = per_minute
+        self._lock = threading.Lock()
+        self._busy = False
+        self._started: Deque[float] = collections.deque()
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._started and now - self._started[0] > 60:
+                self._started.popleft()
+            if self._busy or len(self._started) >= self.per_minute:
+                return False
+            self._busy = True
+            self._started.append(now)
+            return True
+
+    def release(self):
+        with self._lock:
+            self._busy = False
+
+
+class StackSampler:
+    """Folded stacks of the event loop and threadpool workers, sampled from a background thread"""
+
+    # Innermost frames that mean a thread is idle, not working
+    IDLE = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get")}
+
+    def __init__(self, loop_thread: int, interval: float):
+        self.loop_thread = loop_thread
+        self.interval = interval
+        self.stacks: Dict[str, int] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            # Worker threads are started on demand, so look them up on every tick
+            thread_ids = {self.loop_thread, *_worker_thread_ids()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in thread_ids:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in self.IDLE:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+def _worker_thread_ids() -> List[int]:
+    return [t.ident for t in threading.enumerate() if t.name.startswith("AnyIO worker thread")]
+
+def _requested_mode(scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"x-profile":
+            return MODES.get(value.decode("latin-1").strip().lower())
+    if b"profile=" in scope.get("query_string", b""):
+        values = parse_qs(scope["query_string"].decode("latin-1")).get("profile")
+        if values:
+            return MODES.get(values[0].lower())
+    return None
+
+def _bearer_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token
+    return None
+
+async def _is_admin(token: Optional[str]) -> bool:
+    if not token:
+        return False
+    try:
+        async with AsyncSessionLocal() as db:
+            await get_current_admin(await get_current_user(token=token, db=db))
+        return True
+    except HTTPException:
+        return False
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """File for a profile id from list_profiles(), or None if it is not one"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id)
+    return path if os.path.isfile(path) else None
+
+def list_profiles() -> List[dict]:
+    """Stored profiles, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((n for n in os.listdir(PROFILE_DIR) if PROFILE_ID.match(n)), reverse=True)
+    return [{"id": n, "size": os.path.getsize(os.path.join(PROFILE_DIR, n))} for n in names]
+
+def _prune():
+    for entry in list_profiles()[PROFILE_KEEP:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, entry["id"]))
+        except OSError:
+            pass
+
+
+class ProfilingMiddleware:
+    """Profiles requests flagged by an admin (pure ASGI; unflagged requests only pay a header scan)"""
+
+    def __init__(self, app, budget: Optional[ProfileBudget] = None):
+        self.app = app
+        self.budget = budget or ProfileBudget()
+
+    async def __call__(self, scope, receive, send):
+        mode = _requested_mode(scope) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+        if not await _is_admin(_bearer_token(scope)):
+            await self.app(scope, receive, send)  # the flag is ignored for everyone else
+            return
+        if not self.budget.acquire():
+            await self.app(scope, receive, self._with_header(send, b"x-profile", b"skipped"))
+            return
+
+        route = re.sub(r"[^A-Za-z0-9_.-]+", "_", scope["path"]).strip("_") or "root"
+        profile_id = f"{time.time_ns()}-{mode}-{route[:80]}{EXTENSIONS[mode]}"
+        try:
+            if mode == "cprofile":
+                await self._run_cprofile(scope, receive, send, profile_id)
+            else:
+                await self._run_sampled(scope, receive, send, profile_id)
+        finally:
+            self.budget.release()
+
+    async def _run_cprofile(self, scope, receive, send, profile_id: str):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, self._with_header(send, b"x-profile-id", profile_id.encode()))
+        finally:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, profile_id))
+            _prune()
+
+    async def _run_sampled(self, scope, receive, send, profile_id: str):
+        sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        sampler.start()
+        try:
+            await self.app(scope, receive, self._with_header(send, b"x-profile-id", profile_id.encode()))
+        finally:
+            sampler.stop()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(os.path.join(PROFILE_DIR, profile_id), "w") as f:
+                f.write(sampler.folded())
+            _prune()
+
+    @staticmethod
+    def _with_header(send, name: bytes, value: bytes):
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(name, value)]
+            await send(message)
+        return send_with_header
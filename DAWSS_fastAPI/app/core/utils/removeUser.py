@@ -2,11 +2,14 @@
 Utility script to remove users from the database
 Can be run from command line or imported
 """
+import argparse
 import sys
 from sqlalchemy.orm import Session
 from app.core.dependencies.database import SessionLocal
 from app.core.models.user import User
 from app.core.models.seating import Booking, Seat, SeatStatus
+from app.core.utils.batchUsers import run_batch_cli
+from app.core.utils.token_cache import bump_auth_epoch
 
 def remove_user(
         identifier: str,
@@ -67,6 +70,7 @@ def remove_user(
         user_email = user.email
         user_role = user.role
         db.delete(user)
+        bump_auth_epoch(db)
         db.commit()
 
         print(f"✅ Successfully removed user: {user_email} ({user_role})")
@@ -110,6 +114,23 @@ def list_users(db: Session = None):
 
 def main():
     """Command line interface for removing users"""
+    parser = argparse.ArgumentParser(description="Remove users (interactive unless --batch is given)")
+    parser.add_argument("--batch", metavar="FILE", help="file with one email or student ID per line")
+    parser.add_argument("--by", choices=["email", "id"], default="email", help="identifier type in the file")
+    parser.add_argument("--dry-run", action="store_true", help="only print the summary")
+    parser.add_argument("--yes", action="store_true", help="skip the confirmation prompt")
+    args = parser.parse_args()
+
+    if args.batch:
+        try:
+            run_batch_cli(args.batch, "delete", by_email=args.by == "email", dry_run=args.dry_run, assume_yes=args.yes)
+        except KeyboardInterrupt:
+            print("\n\n⚠ Operation cancelled")
+        except Exception as e:
+            print(f"\n❌ Failed to remove users: {e}")
+            sys.exit(1)
+        return
+
     print("=== Remove User ===\n")
 
     try:
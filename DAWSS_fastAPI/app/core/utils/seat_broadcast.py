@@ -0,0 +1,143 @@
+"""
+Live seat-map push
+
+Subscribes to the seat index and fans every seat change out to connected
+WebSocket clients. Each message is encoded once and queued on every
+subscriber's bounded send buffer; a client whose buffer fills up is evicted
+instead of letting messages pile up in memory. Evicted clients reconnect and
+catch up through /api/student/seats/changes.
+
+Seat changes are published from the event loop (async routes) and from
+threadpool workers (admin routes), so delivery always hops onto the loop.
+"""
+import asyncio
+import json
+import os
+import threading
+from typing import List, Optional, Set
+
+from fastapi import WebSocket
+
+SEAT_PUSH_BUFFER = int(os.getenv("SEAT_PUSH_BUFFER", "32"))  # messages per client
+SEAT_PUSH_MAX_SUBSCRIBERS = int(os.getenv("SEAT_PUSH_MAX_SUBSCRIBERS", "10000"))
+
+# Queue sentinels ending a subscriber's send loop
+EVICTED = object()
+DISCONNECTED = object()
+
+
+class Subscriber:
+    """One connected client and its bounded send buffer"""
+    __slots__ = ("queue",)
+
+    def __init__(self, buffer: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, buffer))
+
+    def close(self, reason):
+        """Replace whatever is still buffered with a close sentinel"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(reason)
+
+
+class SeatBroadcaster:
+    """Fan-out of seat changes to WebSocket subscribers"""
+
+    def __init__(self, buffer: int = SEAT_PUSH_BUFFER, max_subscribers: int = SEAT_PUSH_MAX_SUBSCRIBERS):
+        self.buffer = buffer
+        self.max_subscribers = max_subscribers
+        self.evictions = 0
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Bind to the event loop that serves the WebSocket connections"""
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+
+    def stop(self):
+        for subscriber in self._subscribers:
+            subscriber.close(EVICTED)
+        self._subscribers.clear()
+        self._loop = None
+
+    # -------------------
+    # Subscriptions
+    # -------------------
+    def subscribe(self) -> Optional[Subscriber]:
+        """New subscriber, or None when the server is at SEAT_PUSH_MAX_SUBSCRIBERS"""
+        if len(self._subscribers) >= self.max_subscribers:
+            return None
+        subscriber = Subscriber(self.buffer)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    async def serve(self, websocket: WebSocket, subscriber: Subscriber):
+        """Send queued messages until the client disconnects or is evicted"""
+        watcher = asyncio.ensure_future(self._watch_disconnect(websocket, subscriber))
+        try:
+            while True:
+                message = await subscriber.queue.get()
+                if message is DISCONNECTED:
+                    return
+                if message is EVICTED:
+                    await websocket.close(code=1013)  # Try again later
+                    return
+                await websocket.send_text(message)
+        finally:
+            watcher.cancel()
+
+    @staticmethod
+    async def _watch_disconnect(websocket: WebSocket, subscriber: Subscriber):
+        # Clients never send anything; reading only tells us when they leave
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        except Exception:
+            pass
+        subscriber.close(DISCONNECTED)
+
+    # -------------------
+    # Publishing
+    # -------------------
+    def publish_changes(self, epoch: str, version: int, changes: Optional[List[dict]]):
+        """Seat index listener: changes is None when clients must refetch the seat map"""
+        if not self._subscribers or self._loop is None:
+            return
+        if changes is None:
+            message = {"type": "reload", "epoch": epoch, "version": version}
+        else:
+            message = {"type": "seats", "epoch": epoch, "version": version, "changes": changes}
+        self.publish(json.dumps(message))
+
+    def publish(self, message: str):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        if threading.get_ident() == self._loop_thread:
+            self._deliver(message)
+        else:
+            loop.call_soon_threadsafe(self._deliver, message)
+
+    def _deliver(self, message: str):
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._evict(subscriber)
+
+    def _evict(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+        subscriber.close(EVICTED)
+        self.evictions += 1
+
+
+seat_broadcaster = SeatBroadcaster()
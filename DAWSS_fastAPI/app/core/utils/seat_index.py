@@ -0,0 +1,413 @@
+"""
+Process-local seat availability index
+
+Keeps the status and table of every seat in flat arrays keyed by seat id so
+the seat-map endpoints can be answered without loading Table/Seat objects.
+Write paths update it in place after they commit; a periodic reload picks up
+changes made by other processes (CLI utilities, other workers). Only one
+reload runs at a time, and a reload whose snapshot was read while a write
+path changed the index is dropped rather than overwriting that change.
+
+Every change bumps a seat-state version, which the seat-map endpoints send as
+their ETag so unchanged maps can be answered with 304 Not Modified. Status
+changes and removals are also kept in a bounded change log so clients can
+fetch only what changed since the version they have.
+
+A separate layout version only changes when tables or seats are added,
+removed or moved, so the layout document can be cached long-term while the
+statuses are served as one byte per seat id (packed_statuses).
+"""
+import asyncio
+import os
+import secrets
+import threading
+import time
+from array import array
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.models.seating import Table, Seat, SeatStatus
+
+# Seconds between full reloads from the database (0 disables periodic reloads)
+SEAT_INDEX_REFRESH_SECONDS = float(os.getenv("SEAT_INDEX_REFRESH_SECONDS", "30"))
+# Seat changes kept for /seats/changes before clients fall back to a snapshot
+SEAT_CHANGE_LOG_SIZE = int(os.getenv("SEAT_CHANGE_LOG_SIZE", "10000"))
+# Snapshots read before giving up on a reload while writes keep landing
+RELOAD_ATTEMPTS = 3
+
+# Compact status codes stored in the index
+NO_SEAT = -1
+STATUS_CODES = {
+    SeatStatus.AVAILABLE: 0,
+    SeatStatus.SELECTED: 1,
+    SeatStatus.RESERVED: 2,
+    SeatStatus.BLOCKED: 3,
+}
+CODE_STATUSES = {code: status for status, code in STATUS_CODES.items()}
+
+TABLE_FIELDS = ("id", "table_number", "capacity", "position_x", "position_y", "is_active", "section")
+
+
+class SeatIndex:
+    """Array-backed seat status index shared by all seat-map endpoints"""
+
+    def __init__(self, refresh_seconds: float = SEAT_INDEX_REFRESH_SECONDS, change_log_size: int = SEAT_CHANGE_LOG_SIZE):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        # Single-flight reloads: one lock for threadpool callers, one per event loop for async ones
+        self._reload_lock = threading.Lock()
+        self._async_reload_lock: Optional[asyncio.Lock] = None
+        self._async_reload_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loaded_at: Optional[float] = None
+        # Versions are only comparable within one process, so ETags carry an epoch too
+        self._epoch = secrets.token_hex(4)
+        self._version = 0
+        self._layout_version = 0
+        # (version, seat id, status code) per change; versions <= floor are compacted away
+        self._changes: deque = deque(maxlen=max(1, change_log_size))
+        self._changes_floor = 0
+        # Called with (epoch, version, changed seats or None) after every change
+        self._listeners: List[Callable] = []
+        # User id -> booking changes no seat status shows (payment state), for dashboard ETags
+        self._booking_versions: Dict[int, int] = {}
+        self._reset()
+
+    def _reset(self):
+        # Indexed by seat id
+        self._status = array("b")
+        self._seat_number = array("i")
+        self._table_id = array("i")
+        self._table_number = array("i")
+        # Table id -> table fields, and table id -> seat ids in seat order
+        self._tables: Dict[int, dict] = {}
+        self._table_seats: Dict[int, List[int]] = {}
+        # Number of seats per status code, kept in step with _status
+        self._counts = [0] * len(STATUS_CODES)
+
+    def _grow(self, seat_id: int):
+        missing = seat_id + 1 - len(self._status)
+        if missing > 0:
+            self._status.extend([NO_SEAT] * missing)
+            self._seat_number.extend([0] * missing)
+            self._table_id.extend([0] * missing)
+            self._table_number.extend([0] * missing)
+
+    # -------------------
+    # Loading
+    # -------------------
+    @property
+    def is_stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        if self.refresh_seconds <= 0:
+            return False
+        return time.monotonic() - self._loaded_at > self.refresh_seconds
+
+    def ensure_fresh(self, db: Session):
+        """Reload the index if it has never been loaded or is due for a refresh"""
+        if not self.is_stale:
+            return
+        with self._reload_lock:
+            if self.is_stale:  # another thread may have reloaded while we waited
+                self.reload(db)
+
+    async def ensure_fresh_async(self, db: AsyncSession):
+        """Async variant of ensure_fresh for routes using an AsyncSession"""
+        if not self.is_stale:
+            return
+        loop = asyncio.get_running_loop()
+        if self._async_reload_loop is not loop:
+            self._async_reload_lock, self._async_reload_loop = asyncio.Lock(), loop
+        async with self._async_reload_lock:
+            if self.is_stale:  # concurrent requests wait for one reload instead of each running it
+                await db.run_sync(self.reload)
+
+    def reload(self, db: Session):
+        """Rebuild the index from the database with two column-only queries
+
+        If a write path changes the index while the snapshot is being read,
+        the snapshot may predate that change, so it is dropped and read
+        again. After RELOAD_ATTEMPTS the current index is kept until the
+        next refresh (a first load is applied regardless).
+        """
+        for _ in range(RELOAD_ATTEMPTS):
+            read_at = self._version
+            table_rows = db.execute(select(*(getattr(Table, f) for f in TABLE_FIELDS))).all()
+            seat_rows = db.execute(
+                select(Seat.id, Seat.seat_number, Seat.table_id, Seat.status)
+            ).all()
+            if self.load_rows(table_rows, seat_rows, read_at=read_at):
+                return
+        with self._lock:
+            if self._loaded_at is None:
+                self.load_rows(table_rows, seat_rows)
+            else:
+                self._loaded_at = time.monotonic()
+
+    def load_rows(self, table_rows, seat_rows, read_at: Optional[int] = None) -> bool:
+        """Replace the index with these rows; False (nothing applied) if the version moved past read_at"""
+        with self._lock:
+            if read_at is not None and self._version != read_at:
+                return False
+            previous = self._state()
+            previous_layout = self._layout_state()
+            self._reset()
+            for row in table_rows:
+                self._put_table(dict(zip(TABLE_FIELDS, row)))
+            for seat_id, seat_number, table_id, seat_status in seat_rows:
+                self._put_seat(seat_id, seat_number, table_id, seat_status)
+            for seat_ids in self._table_seats.values():
+                seat_ids.sort(key=lambda sid: (self._seat_number[sid], sid))
+            # Periodic reloads that find nothing new keep the version (and ETags) valid
+            if self._layout_state() != previous_layout:
+                self._layout_version += 1
+            if self._state() != previous:
+                self._version += 1
+                self._compact_changes()
+            self._loaded_at = time.monotonic()
+            return True
+
+    def _state(self):
+        return self._status, self._seat_number, self._table_id, self._tables, self._table_seats
+
+    def _layout_state(self):
+        seats = {
+            table_id: [(seat_id, self._seat_number[seat_id]) for seat_id in seat_ids]
+            for table_id, seat_ids in self._table_seats.items()
+        }
+        return self._tables, seats
+
+    def _put_table(self, fields: dict):
+        self._tables[fields["id"]] = fields
+        self._table_seats.setdefault(fields["id"], [])
+
+    def _put_seat(self, seat_id: int, seat_number: int, table_id: int, seat_status):
+        table = self._tables.get(table_id)
+        if table is None:
+            return
+        self._grow(seat_id)
+        self._store_status(seat_id, STATUS_CODES[SeatStatus(seat_status)])
+        self._seat_number[seat_id] = seat_number
+        self._table_id[seat_id] = table_id
+        self._table_number[seat_id] = table["table_number"]
+        self._table_seats[table_id].append(seat_id)
+
+    def _store_status(self, seat_id: int, code: int):
+        previous = self._status[seat_id]
+        if previous != NO_SEAT:
+            self._counts[previous] -= 1
+        if code != NO_SEAT:
+            self._counts[code] += 1
+        self._status[seat_id] = code
+
+    def add_listener(self, listener: Callable):
+        self._listeners.append(listener)
+
+    def _notify(self, changes: Optional[List[dict]]):
+        for listener in self._listeners:
+            listener(self._epoch, self._version, changes)
+
+    def _log_change(self, seat_id: int, code: int):
+        if len(self._changes) == self._changes.maxlen:
+            self._changes_floor = self._changes[0][0]
+        self._changes.append((self._version, seat_id, code))
+
+    def _compact_changes(self):
+        """Drop the log; clients behind the current version get a snapshot"""
+        self._changes.clear()
+        self._changes_floor = self._version
+        self._notify(None)
+
+    # -------------------
+    # Writes
+    # -------------------
+    def set_status(self, seat_id: int, seat_status: SeatStatus):
+        with self._lock:
+            if self.status(seat_id) is None:
+                return
+            code = STATUS_CODES[SeatStatus(seat_status)]
+            self._store_status(seat_id, code)
+            self._version += 1
+            self._log_change(seat_id, code)
+            self._notify([self.seat(seat_id)])
+
+    def touch_booking(self, user_id: int):
+        """Record a change to a user's booking that leaves the seat status as it is"""
+        with self._lock:
+            self._booking_versions[user_id] = self._booking_versions.get(user_id, 0) + 1
+
+    def add_table(self, table: Table):
+        """Add a newly created table together with its seats"""
+        with self._lock:
+            self._put_table({f: getattr(table, f) for f in TABLE_FIELDS})
+            for seat in sorted(table.seats, key=lambda s: (s.seat_number, s.id)):
+                self._put_seat(seat.id, seat.seat_number, seat.table_id, seat.status)
+            self._version += 1
+            self._layout_version += 1
+            # Clients need the new table's layout, not just its seats
+            self._compact_changes()
+
+    def remove_table(self, table_id: int):
+        with self._lock:
+            self._version += 1
+            removed = []
+            for seat_id in self._table_seats.pop(table_id, []):
+                self._store_status(seat_id, NO_SEAT)
+                self._log_change(seat_id, NO_SEAT)
+                removed.append({"id": seat_id, "table_id": table_id, "status": None})
+            self._tables.pop(table_id, None)
+            self._layout_version += 1
+            self._notify(removed)
+
+    # -------------------
+    # Reads
+    # -------------------
+    @property
+    def version(self) -> int:
+        """Seat-state version, bumped by every change to the index"""
+        return self._version
+
+    @property
+    def epoch(self) -> str:
+        """Identifies this process's index; versions from another epoch are meaningless here"""
+        return self._epoch
+
+    @property
+    def layout_tag(self) -> str:
+        """Identifies the current table/seat layout (not statuses)"""
+        return f"{self._epoch}-{self._layout_version}"
+
+    def etag(self, *parts, version: Optional[int] = None) -> str:
+        """Strong ETag for the current (or given) seat state, optionally scoped (e.g. per user)"""
+        version = self._version if version is None else version
+        return '"' + "-".join([self._epoch, str(version), *map(str, parts)]) + '"'
+
+    def user_etag(self, user_id: int) -> str:
+        """ETag for a user's view: seat state plus that user's booking version"""
+        return self.etag("u", user_id, self._booking_versions.get(user_id, 0))
+
+    def status(self, seat_id: int) -> Optional[SeatStatus]:
+        """Seat status, or None if the seat does not exist"""
+        if seat_id < 0 or seat_id >= len(self._status):
+            return None
+        code = self._status[seat_id]
+        if code == NO_SEAT:
+            return None
+        return CODE_STATUSES[code]
+
+    def table_number(self, seat_id: int) -> Optional[int]:
+        if self.status(seat_id) is None:
+            return None
+        return self._table_number[seat_id]
+
+    def seat(self, seat_id: int) -> Optional[dict]:
+        seat_status = self.status(seat_id)
+        if seat_status is None:
+            return None
+        return {
+            "id": seat_id,
+            "seat_number": self._seat_number[seat_id],
+            "table_id": self._table_id[seat_id],
+            "status": seat_status,
+            "table_number": self._table_number[seat_id],
+        }
+
+    def counts(self) -> Dict[SeatStatus, int]:
+        """Number of seats in each status, across all tables"""
+        with self._lock:
+            return {status: self._counts[code] for status, code in STATUS_CODES.items()}
+
+    def changes_since(self, since: int) -> Optional[Tuple[int, List[dict]]]:
+        """(version, seats changed after `since`), or None if those changes were compacted away
+
+        Removed seats are reported with status None. Seats of inactive tables
+        are skipped, as in tables().
+        """
+        with self._lock:
+            if since < self._changes_floor or since > self._version:
+                return None
+            latest: Dict[int, int] = {}
+            for version, seat_id, code in reversed(self._changes):
+                if version <= since:
+                    break
+                latest.setdefault(seat_id, code)
+
+            changes = []
+            for seat_id in sorted(latest):
+                seat = self.seat(seat_id)
+                if seat is None:
+                    changes.append({"id": seat_id, "table_id": self._table_id[seat_id], "status": None})
+                elif self._tables[seat["table_id"]]["is_active"]:
+                    changes.append(seat)
+            return self._version, changes
+
+    def packed_statuses(self) -> Tuple[int, str, bytes]:
+        """(version, layout tag, status code per seat id) with 0xFF where there is no seat"""
+        with self._lock:
+            return self._version, self.layout_tag, self._status.tobytes()
+
+    def layout(self) -> Tuple[str, List[dict]]:
+        """(layout tag, active tables with [seat id, seat number] pairs) - no statuses"""
+        with self._lock:
+            tables = []
+            for table_id in sorted(self._tables):
+                table = self._tables[table_id]
+                if not table["is_active"]:
+                    continue
+                tables.append({
+                    **table,
+                    "seats": [[seat_id, self._seat_number[seat_id]] for seat_id in self._table_seats[table_id]],
+                })
+            return self.layout_tag, tables
+
+    def snapshot(self, active_only: bool = True) -> Tuple[int, List[dict]]:
+        """(version, tables) read consistently"""
+        with self._lock:
+            return self._version, self.tables(active_only)
+
+    def tables(self, active_only: bool = True) -> List[dict]:
+        """Tables with their seats, shaped like TableResponse"""
+        with self._lock:
+            result = []
+            for table_id in sorted(self._tables):
+                table = self._tables[table_id]
+                if active_only and not table["is_active"]:
+                    continue
+                result.append({
+                    **table,
+                    "seats": [self.seat(seat_id) for seat_id in self._table_seats[table_id]],
+                })
+            return result
+
+
+class SeatClaims:
+    """Lets only one request per seat attempt the database claim at a time
+
+    Requests for a seat that is already being claimed wait for that attempt
+    to finish and then re-check the index, so a rush on one seat costs a
+    single write transaction per process instead of one per request.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[int, asyncio.Event] = {}
+
+    @asynccontextmanager
+    async def claim(self, seat_id: int):
+        while (pending := self._in_flight.get(seat_id)) is not None:
+            await pending.wait()
+        done = asyncio.Event()
+        self._in_flight[seat_id] = done
+        try:
+            yield
+        finally:
+            del self._in_flight[seat_id]
+            done.set()
+
+
+seat_index = SeatIndex()
+seat_claims = SeatClaims()
@@ -0,0 +1,167 @@
+"""
+Pre-rendered pages and precompressed static files
+
+None of the HTML pages depend on the request, so every template is rendered
+once (at startup) and kept in memory together with every file under
+app/static. Each one is stored with a gzip variant and, when the optional
+brotli package is installed, a brotli variant.
+
+Templates link static files with static_url("css/style.css"), which returns
+a content-hashed URL such as /static/css/style.3f2a9c1e04b7.css. Those URLs
+are served with an immutable Cache-Control, because a changed file gets a
+new URL and browsers never need to revalidate. Pages and the plain
+/static/... paths are served with no-cache and a strong ETag, so a repeat
+visit gets a 304.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from fastapi import Request, Response, status
+from jinja2 import Environment, FileSystemLoader
+
+from app.core.utils.http_cache import etag_matches
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+HASH_LENGTH = 12
+MIN_COMPRESS_SIZE = 256  # bytes; smaller bodies are sent as they are
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+@dataclass
+class Asset:
+    """One pre-built response body and its compressed variants"""
+    body: bytes
+    media_type: str
+    digest: str
+    cache_control: str
+    encoded: Dict[str, bytes] = field(default_factory=dict)  # content-coding -> body
+
+    def response(self, request: Request) -> Response:
+        coding = choose_encoding(request.headers.get("accept-encoding", ""), self.encoded)
+        # Strong ETags must differ between encodings of the same content
+        etag = f'"{self.digest}-{coding}"' if coding else f'"{self.digest}"'
+        headers = {"ETag": etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        body = self.encoded[coding] if coding else self.body
+        if coding:
+            headers["Content-Encoding"] = coding
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            body = b""
+        return Response(body, media_type=self.media_type, headers=headers)
+
+
+def choose_encoding(accept_encoding: str, available: Dict[str, bytes]) -> Optional[str]:
+    """Best precompressed variant the client accepts (brotli before gzip), or None"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip())
+    for coding in ("br", "gzip"):
+        if coding in available and (coding in accepted or "*" in accepted):
+            return coding
+    return None
+
+def _compress(body: bytes, media_type: str) -> Dict[str, bytes]:
+    if len(body) < MIN_COMPRESS_SIZE or not media_type.startswith(COMPRESSIBLE_TYPES):
+        return {}
+    encoded = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded["br"] = brotli.compress(body, quality=11)
+    return {coding: data for coding, data in encoded.items() if len(data) < len(body)}
+
+
+class SiteAssets:
+    """In-memory pages and static files, built once by build()"""
+
+    def __init__(self, static_dir: str, template_dir: str, url_prefix: str = "/static"):
+        self.static_dir = static_dir
+        self.template_dir = template_dir
+        self.url_prefix = url_prefix
+        self._lock = threading.Lock()
+        self._static: Dict[str, Asset] = {}
+        self._pages: Dict[str, Asset] = {}
+        self._urls: Dict[str, str] = {}
+        self._built = False
+
+    def build(self):
+        """Hash and compress app/static, then render and compress every template"""
+        static: Dict[str, Asset] = {}
+        urls: Dict[str, str] = {}
+        for root, _, files in os.walk(self.static_dir):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                rel = os.path.relpath(path, self.static_dir).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    body = f.read()
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+                stem, ext = posixpath.splitext(rel)
+                hashed = f"{stem}.{digest}{ext}"
+                encoded = _compress(body, media_type)
+
+                static[rel] = Asset(body, media_type, digest, REVALIDATE_CACHE_CONTROL, encoded)
+                static[hashed] = Asset(body, media_type, digest, IMMUTABLE_CACHE_CONTROL, encoded)
+                urls[rel] = f"{self.url_prefix}/{hashed}"
+
+        def static_url(path: str) -> str:
+            try:
+                return urls[path]
+            except KeyError:
+                raise ValueError(f"Unknown static file: {path}") from None
+
+        env = Environment(loader=FileSystemLoader(self.template_dir), autoescape=True)
+        env.globals["static_url"] = static_url
+        pages: Dict[str, Asset] = {}
+        for name in env.list_templates(filter_func=lambda n: n.endswith(".html")):
+            body = env.get_template(name).render().encode()
+            digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+            pages[name] = Asset(body, "text/html", digest, REVALIDATE_CACHE_CONTROL, _compress(body, "text/html"))
+
+        with self._lock:
+            self._static, self._pages, self._urls = static, pages, urls
+            self._built = True
+
+    def _ensure_built(self):
+        if not self._built:
+            self.build()
+
+    def static_url(self, path: str) -> str:
+        self._ensure_built()
+        return self._urls[path]
+
+    def page(self, request: Request, name: str) -> Response:
+        self._ensure_built()
+        return self._pages[name].response(request)
+
+    def static(self, request: Request, path: str) -> Optional[Response]:
+        """Response for a path under /static, or None if there is no such file"""
+        self._ensure_built()
+        asset = self._static.get(path)
+        return asset.response(request) if asset else None
+
+
+site_assets = SiteAssets(static_dir="app/static", template_dir="app/templates")
@@ -0,0 +1,153 @@
+"""
+Cache of verified access tokens
+
+Maps a token that has already been decoded and matched to a user onto a small
+snapshot of that user, so authenticated requests skip both the JWT decode and
+the users lookup. Entries expire after AUTH_CACHE_TTL_SECONDS (or with the
+token, if sooner).
+
+Users are only changed by the CLI scripts (modCredentials, removeUser,
+batchUsers), which run in their own process and cannot reach this cache.
+They call bump_auth_epoch() in the transaction that changes users. Each
+server watches the auth_epoch row from a background thread, every
+AUTH_EPOCH_CHECK_SECONDS, and drops the whole cache when it moves. A
+deactivated, demoted or removed user therefore loses cached access within
+about a second, without a query on the request path.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.dependencies.database import SessionLocal
+from app.core.models.user import AuthEpoch, UserRole
+
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_EPOCH_CHECK_SECONDS = float(os.getenv("AUTH_EPOCH_CHECK_SECONDS", "1"))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """The user fields the routes need for authorisation"""
+    id: int
+    role: UserRole
+    is_active: bool
+
+
+class TokenCache:
+    """LRU + TTL cache of token -> UserSnapshot"""
+
+    def __init__(
+            self,
+            ttl_seconds: float = AUTH_CACHE_TTL_SECONDS,
+            max_size: int = AUTH_CACHE_SIZE,
+            epoch_check_seconds: float = AUTH_EPOCH_CHECK_SECONDS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.epoch_check_seconds = epoch_check_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, UserSnapshot]]" = OrderedDict()
+        # Bumped by clear(); snapshots read before a clear are not cached after it
+        self._generation = 0
+        self._epoch: Optional[int] = None
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    @property
+    def generation(self) -> int:
+        """Read before loading a user; pass to put() so a clear in between wins"""
+        return self._generation
+
+    def get(self, token: str) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return snapshot
+
+    def put(
+            self,
+            token: str,
+            snapshot: UserSnapshot,
+            token_expires_in: Optional[float] = None,
+            generation: Optional[int] = None,
+    ):
+        if self.ttl_seconds <= 0 or self.max_size <= 0:
+            return
+        ttl = self.ttl_seconds if token_expires_in is None else min(self.ttl_seconds, token_expires_in)
+        if ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return  # the cache was cleared while this snapshot was being read
+            self._entries[token] = (time.monotonic() + ttl, snapshot)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    # -------------------
+    # Auth epoch
+    # -------------------
+    def start(self):
+        """Watch the auth epoch from a background thread (no-op while caching is off)"""
+        if self.ttl_seconds <= 0 or self.epoch_check_seconds <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+        self.check_epoch()
+        self._watcher = threading.Thread(target=self._watch, name="auth-epoch-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.join()
+
+    def _watch(self):
+        while not self._stop.wait(self.epoch_check_seconds):
+            try:
+                self.check_epoch()
+            except Exception:
+                logger.exception("Could not read the auth epoch; cached tokens are kept until the next check")
+
+    def check_epoch(self):
+        """Drop every cached token if a script has bumped the auth epoch since the last check"""
+        db = SessionLocal()
+        try:
+            epoch = db.scalar(select(AuthEpoch.version).where(AuthEpoch.id == 1)) or 0
+        finally:
+            db.close()
+        if epoch != self._epoch:
+            if self._epoch is not None:
+                self.clear()
+            self._epoch = epoch
+
+
+def bump_auth_epoch(db: Session):
+    """Make running servers drop cached tokens; call in the transaction that changes users"""
+    AuthEpoch.__table__.create(db.connection(), checkfirst=True)  # databases created before the table
+    if not db.execute(update(AuthEpoch).where(AuthEpoch.id == 1).values(version=AuthEpoch.version + 1)).rowcount:
+        db.add(AuthEpoch(id=1, version=1))
+
+
+token_cache = TokenCache()
@@ -0,0 +1,206 @@
+"""
+Virtual waiting room for the sale opening
+
+With WAITING_ROOM_ENABLED=1, the student and payment routes only serve
+students holding a queue pass. Everyone else gets a 429 pointing at
+/api/waiting-room/join, which hands out a signed ticket with a place in a
+FIFO queue. Tickets are admitted in order by a token bucket:
+WAITING_ROOM_RATE students per second, with up to WAITING_ROOM_BURST let in
+at once when nobody is waiting. Set the rate from measured booking capacity
+(see benchmarks/ticket_drop.py). An admitted ticket is exchanged for a pass
+that is valid until WAITING_ROOM_PASS_TTL seconds after the ticket was
+admitted; after that the ticket is refused. Joining again keeps a student's
+ticket until it has been exchanged or its time is up, then they go to the
+back of the queue.
+
+Tickets and passes are HMAC-signed and bound to the student (a keyed hash
+of the access token's subject), so the status endpoint can check them
+without the database and they are useless to anyone else. The queue lives
+in process memory: run a single worker while it is enabled. A restart
+starts a new queue (tickets from before are refused and students rejoin);
+passes remain valid.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from typing import Deque, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.requests import HTTPConnection
+from jose import JWTError, jwt
+
+from app.core.utils.auth import ALGORITHM, SECRET_KEY
+
+WAITING_ROOM_ENABLED = os.getenv("WAITING_ROOM_ENABLED", "false").lower() in ("1", "true", "yes")
+WAITING_ROOM_RATE = float(os.getenv("WAITING_ROOM_RATE", "20"))  # admissions per second
+WAITING_ROOM_BURST = int(os.getenv("WAITING_ROOM_BURST", "50"))
+WAITING_ROOM_PASS_TTL = int(os.getenv("WAITING_ROOM_PASS_TTL", "900"))  # seconds to finish buying
+WAITING_ROOM_SECRET = os.getenv("WAITING_ROOM_SECRET", SECRET_KEY)
+
+JOIN_PATH = "/api/waiting-room/join"
+
+
+def token_subject(token: str) -> Optional[str]:
+    """Subject (email) of a valid access token, checked without the database"""
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+
+class WaitingRoom:
+    """FIFO queue of signed tickets drained by a token bucket"""
+
+    def __init__(
+            self,
+            rate: float = WAITING_ROOM_RATE,
+            burst: int = WAITING_ROOM_BURST,
+            pass_ttl: int = WAITING_ROOM_PASS_TTL,
+            secret: str = WAITING_ROOM_SECRET,
+            enabled: bool = WAITING_ROOM_ENABLED,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.pass_ttl = pass_ttl
+        self.enabled = enabled
+        self._key = secret.encode()
+        self.epoch = secrets.token_hex(4)  # tickets from an earlier process are refused
+        self._lock = threading.Lock()
+        self._issued = 0  # last ticket number handed out
+        self._admitted = 0  # tickets up to this number are let in
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        # student -> ticket number, in ticket order, for tickets not exchanged or expired yet
+        self._tickets: "OrderedDict[str, int]" = OrderedDict()
+        # (last ticket admitted, time) at most a second apart, for the last pass_ttl seconds
+        self._admissions: Deque[Tuple[int, float]] = deque()
+        self._expired = 0  # tickets up to this number were admitted more than pass_ttl ago
+
+    # -------------------
+    # Signing
+    # -------------------
+    def _sign(self, payload: str) -> str:
+        signature = hmac.new(self._key, payload.encode(), hashlib.sha256).hexdigest()[:32]
+        return f"{payload}.{signature}"
+
+    def _verify(self, value: str) -> Optional[list]:
+        payload, _, signature = value.rpartition(".")
+        if not payload or not hmac.compare_digest(self._sign(payload), value):
+            return None
+        return payload.split(".")
+
+    def student_key(self, subject: str) -> str:
+        return hmac.new(self._key, subject.encode(), hashlib.sha256).hexdigest()[:16]
+
+    # -------------------
+    # Queue
+    # -------------------
+    def _advance(self):
+        """Refill the bucket, admit waiting tickets in order and expire old admissions (lock held)"""
+        now = time.monotonic()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        admit = min(int(self._tokens), self._issued - self._admitted)
+        wall = time.time()
+        if admit > 0:
+            self._admitted += admit
+            self._tokens -= admit
+            if self._admissions and wall - self._admissions[-1][1] < 1:
+                self._admissions[-1] = (self._admitted, self._admissions[-1][1])
+            else:
+                self._admissions.append((self._admitted, wall))
+        while self._admissions and self._admissions[0][1] + self.pass_ttl <= wall:
+            self._expired = self._admissions.popleft()[0]
+        while self._tickets and next(iter(self._tickets.values())) <= self._expired:
+            self._tickets.popitem(last=False)
+
+    def join(self, subject: str) -> str:
+        """Ticket for a student; the same place in the queue if they already have a live one"""
+        student = self.student_key(subject)
+        with self._lock:
+            self._advance()
+            number = self._tickets.get(student)
+            if number is None:
+                self._issued += 1
+                number = self._tickets[student] = self._issued
+        return self._sign(f"t.{self.epoch}.{student}.{number}")
+
+    def read_ticket(self, ticket: str) -> Optional[Tuple[str, int]]:
+        """(student key, ticket number) of a valid ticket from this queue, or None"""
+        parts = self._verify(ticket)
+        if not parts or len(parts) != 4 or parts[0] != "t" or parts[1] != self.epoch:
+            return None
+        return parts[2], int(parts[3])
+
+    def position(self, number: int) -> int:
+        """Tickets still ahead of this one (0 = admitted)"""
+        with self._lock:
+            self._advance()
+            return max(0, number - self._admitted)
+
+    def claim(self, student: str, number: int) -> Optional[str]:
+        """Queue pass for an admitted ticket, or None if its time is up
+
+        The pass runs out pass_ttl after the ticket was admitted, however
+        often it is claimed. Joining again afterwards gives a new ticket.
+        """
+        with self._lock:
+            self._advance()
+            if number > self._admitted or number <= self._expired:
+                return None
+            admitted_at = self._admissions[bisect_left(self._admissions, (number,))][1]
+            if self._tickets.get(student) == number:
+                del self._tickets[student]
+        return self.issue_pass(student, int(admitted_at) + self.pass_ttl)
+
+    def issue_pass(self, student: str, expires: Optional[int] = None) -> str:
+        expires = int(time.time()) + self.pass_ttl if expires is None else expires
+        return self._sign(f"p.{student}.{expires}")
+
+    def check_pass(self, queue_pass: str, subject: str) -> bool:
+        parts = self._verify(queue_pass)
+        return (
+            parts is not None and len(parts) == 3 and parts[0] == "p"
+            and hmac.compare_digest(parts[1], self.student_key(subject))
+            and int(parts[2]) > time.time()
+        )
+
+    @property
+    def waiting(self) -> int:
+        with self._lock:
+            self._advance()
+            return self._issued - self._admitted
+
+    @property
+    def admitted(self) -> int:
+        return self._admitted
+
+
+waiting_room = WaitingRoom()
+
+
+async def require_admission(connection: HTTPConnection):
+    """Router dependency: let a request through only with a valid queue pass while the room is on
+
+    Requests without a valid access token are left to the route's own auth
+    (401). WebSockets are not gated: they only receive pushed seat changes.
+    """
+    if not waiting_room.enabled or connection.scope["type"] != "http":
+        return
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    subject = token_subject(token) if scheme.lower() == "bearer" and token else None
+    if subject is None:
+        return
+    queue_pass = connection.headers.get("x-queue-pass") or connection.query_params.get("queue_pass")
+    if queue_pass and waiting_room.check_pass(queue_pass, subject):
+        return
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Ticket sales are busy. Join the waiting room to get your turn.",
+        headers={"X-Waiting-Room": JOIN_PATH, "Retry-After": "1"},
+    )
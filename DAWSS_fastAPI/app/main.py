@@ -1,8 +1,20 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from app.core.dependencies.database import engine, Base
-from app.core.routers import auth, student, admin, payment, pages
+from app.core.dependencies.query_stats import QueryStatsMiddleware
+from app.core.routers import auth, student, admin, payment, pages, waiting_room
+from app.core.utils.hashing import hashing_executor
+from app.core.utils.seat_index import seat_index
+from app.core.utils.seat_broadcast import seat_broadcaster
+from app.core.utils.site_assets import site_assets
+from app.core.utils.metrics import MetricsMiddleware, CallbackGauge, registry
+from app.core.utils.profiling import PROFILING_ENABLED, ProfilingMiddleware
+from app.core.utils.idempotency import IdempotencyMiddleware
+from app.core.utils.payment_outbox import payment_workers
+from app.core.utils.token_cache import token_cache
+from app.core.utils.waiting_room import waiting_room as sale_queue
+import asyncio
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -13,6 +25,9 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Idempotency-Key replays for book-seat and payment (innermost, so CORS applies to replays too)
+app.add_middleware(IdempotencyMiddleware)
+
 # CORS middleware for frontend access
 app.add_middleware(
     CORSMiddleware,
@@ -22,10 +37,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Admin-triggered request profiling (X-Profile header / ?profile=), off unless PROFILING_ENABLED
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Statements and DB time per request (X-DB-Queries header with QUERY_STATS_HEADER=1)
+app.add_middleware(QueryStatsMiddleware)
 
-# Include page router first to serve HTML pages
+# Latency histograms, status codes and in-flight requests, exported at /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Include page router first to serve HTML pages and /static
 app.include_router(pages.router)
 
 # Include API routers
@@ -33,8 +55,85 @@ app.include_router(auth.router)
 app.include_router(student.router)
 app.include_router(admin.router)
 app.include_router(payment.router)
+app.include_router(waiting_room.router)
+
+
+@app.on_event("startup")
+async def start_hashing_pool():
+    hashing_executor.start()
+
+
+@app.on_event("startup")
+async def build_site_assets():
+    # Render pages and hash/compress static files once per process
+    site_assets.build()
+
+
+@app.on_event("startup")
+async def start_seat_broadcaster():
+    seat_broadcaster.start(asyncio.get_running_loop())
+
+
+@app.on_event("startup")
+async def start_payment_workers():
+    # Also resubmits charges left in the outbox by a previous run, then sweeps it periodically
+    payment_workers.start()
+
+
+@app.on_event("startup")
+async def start_auth_epoch_watcher():
+    # Drops cached tokens when the CLI scripts change users
+    token_cache.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_hashing_pool():
+    hashing_executor.shutdown()
+
+
+@app.on_event("shutdown")
+async def stop_seat_broadcaster():
+    seat_broadcaster.stop()
+
+
+@app.on_event("shutdown")
+async def stop_auth_epoch_watcher():
+    token_cache.stop()
+
+
+@app.on_event("shutdown")
+async def stop_payment_workers():
+    await asyncio.get_running_loop().run_in_executor(None, payment_workers.stop)
+
+
+# Seat changes from every write path are pushed to WebSocket subscribers
+seat_index.add_listener(seat_broadcaster.publish_changes)
+
+registry.register(CallbackGauge(
+    "seat_push_subscribers", "Open seat-update WebSockets", lambda: seat_broadcaster.subscriber_count
+))
+registry.register(CallbackGauge(
+    "seat_push_evictions_total", "Seat-update WebSockets dropped for reading too slowly",
+    lambda: seat_broadcaster.evictions, kind="counter"
+))
+registry.register(CallbackGauge(
+    "payment_outbox_pending", "Charges queued or in progress on this process's payment workers",
+    lambda: payment_workers.pending
+))
+registry.register(CallbackGauge(
+    "waiting_room_queue_length", "Students holding a ticket who have not been admitted yet", lambda: sale_queue.waiting
+))
+registry.register(CallbackGauge(
+    "waiting_room_admitted_total", "Tickets admitted from the waiting room", lambda: sale_queue.admitted, kind="counter"
+))
 
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
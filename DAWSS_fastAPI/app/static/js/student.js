@@ -46,21 +46,91 @@ function displayUserName() {
     }
 }
 
+// Wait in the sale waiting room until admitted; resolves with the queue pass
+async function waitForAdmission(joinPath) {
+    const notice = document.getElementById('waiting-room');
+    const joined = await fetch(`${API_BASE}${joinPath}`, {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${getToken()}` }
+    });
+    if (!joined.ok) {
+        throw new Error('Failed to join the waiting room');
+    }
+    let status = await joined.json();
+
+    while (!status.admitted) {
+        if (notice) {
+            notice.style.display = 'block';
+            notice.textContent = `You're in line: ${status.position} ahead of you (about ${Math.ceil(status.eta_seconds)}s).`;
+        }
+        await new Promise(resolve => setTimeout(resolve, status.poll_after_seconds * 1000));
+        const response = await fetch(
+            `${API_BASE}/api/waiting-room/status?ticket=${encodeURIComponent(status.ticket)}`
+        );
+        if (response.status === 409) {
+            return waitForAdmission(joinPath);  // server restarted: rejoin
+        }
+        status = await response.json();
+    }
+    if (notice) {
+        notice.style.display = 'none';
+    }
+    sessionStorage.setItem('queuePass', status.queue_pass);
+    return status.queue_pass;
+}
+
+// fetch() for student/payment API calls: adds the auth token and the queue pass,
+// and goes through the waiting room when the server asks for it
+async function studentFetch(url, options = {}) {
+    // POSTs carry one Idempotency-Key across retries, so a retry never books or charges twice
+    const idempotencyKey = (options.method || 'GET').toUpperCase() === 'POST' ? crypto.randomUUID() : null;
+    const send = () => fetch(url, {
+        ...options,
+        headers: {
+            ...(options.headers || {}),
+            'Authorization': `Bearer ${getToken()}`,
+            ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
+            ...(sessionStorage.getItem('queuePass') ? { 'X-Queue-Pass': sessionStorage.getItem('queuePass') } : {})
+        }
+    });
+
+    const response = await send();
+    const joinPath = response.headers.get('X-Waiting-Room');
+    if (response.status !== 429 || !joinPath) {
+        return response;
+    }
+    await waitForAdmission(joinPath);
+    return send();
+}
+
+// Poll the payment status until the payment workers have answered
+async function waitForPayment(bookingId) {
+    while (true) {
+        const response = await studentFetch(`${API_BASE}/api/payment/status/${bookingId}`);
+        if (!response.ok) {
+            throw new Error('Failed to load payment status');
+        }
+        const status = await response.json();
+        if (status.payment_status !== 'processing') {
+            return status;
+        }
+        await new Promise(resolve => setTimeout(resolve, status.poll_after_seconds * 1000));
+    }
+}
+
 // Load booking status
 async function loadBookingStatus() {
-    const token = getToken();
     const bookingContent = document.getElementById('booking-content');
 
     try {
-        const response = await fetch(`${API_BASE}/api/student/my-booking`, {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
+        const response = await studentFetch(`${API_BASE}/api/student/my-booking`);
 
         if (response.ok) {
             const booking = await response.json();
             displayBooking(booking);
+            if (booking.payment_status === 'processing') {
+                waitForPayment(booking.id).then(loadBookingStatus);
+            }
 
             // Show manage booking card, hide view seats card
             document.getElementById('manage-booking-card').style.display = 'block';
@@ -97,6 +167,10 @@ function displayBooking(booking) {
 
     const statusBadge = booking.payment_status === 'completed'
         ? '<span style="background: var(--success-color); padding: 0.5rem 1rem; border-radius: 20px; font-weight: bold;">✓ Paid</span>'
+        : booking.payment_status === 'processing'
+        ? '<span style="background: var(--warning-color); padding: 0.5rem 1rem; border-radius: 20px; font-weight: bold;">⏳ Processing Payment</span>'
+        : booking.payment_status === 'failed'
+        ? '<span style="background: var(--error-color); padding: 0.5rem 1rem; border-radius: 20px; font-weight: bold;">✗ Payment Failed</span>'
         : '<span style="background: var(--warning-color); padding: 0.5rem 1rem; border-radius: 20px; font-weight: bold;">⏳ Pending Payment</span>';
 
     bookingContent.innerHTML = `
@@ -133,10 +207,14 @@ function displayBooking(booking) {
                 </div>
             </div>
 
-            ${booking.payment_status === 'pending' ? `
+            ${booking.payment_status === 'pending' || booking.payment_status === 'failed' ? `
                 <a href="/student/booking" class="btn btn-primary btn-block">
-                    Complete Payment
+                    ${booking.payment_status === 'failed' ? 'Try Payment Again' : 'Complete Payment'}
                 </a>
+            ` : booking.payment_status === 'processing' ? `
+                <div style="text-align: center; color: var(--text-secondary);">
+                    Your payment is being processed. This page updates when it is done.
+                </div>
             ` : `
                 <div style="text-align: center; color: var(--success-color); font-weight: bold;">
                     ✓ Your ticket is confirmed! See you at prom!
@@ -146,6 +224,52 @@ function displayBooking(booking) {
     `;
 }
 
+// Decode a packed seat map into the same shape as /api/student/tables.
+// layout: document from /api/student/seats/layout
+// statuses: Uint8Array from /api/student/seats/status (byte i = status code of seat i)
+function decodeSeatMap(layout, statuses) {
+    return layout.tables.map(table => ({
+        ...table,
+        seats: table.seats.map(([id, seatNumber]) => ({
+            id: id,
+            seat_number: seatNumber,
+            table_id: table.id,
+            table_number: table.table_number,
+            status: layout.status_codes[statuses[id]] || null
+        }))
+    }));
+}
+
+// Decode the ?encoding=base64 variant of /api/student/seats/status
+function decodeBase64Statuses(text) {
+    const binary = atob(text);
+    const statuses = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        statuses[i] = binary.charCodeAt(i);
+    }
+    return statuses;
+}
+
+// Load the seat map as packed statuses plus a layout the browser keeps cached.
+// Resolves with the same tables as /api/student/tables, so the seating page can
+// use it in place of that endpoint.
+async function loadPackedSeatMap() {
+    const statusResponse = await studentFetch(`${API_BASE}/api/student/seats/status`);
+    if (!statusResponse.ok) {
+        throw new Error('Failed to load seat status');
+    }
+    const layoutVersion = statusResponse.headers.get('X-Layout-Version');
+    const statuses = new Uint8Array(await statusResponse.arrayBuffer());
+
+    const layoutResponse = await studentFetch(
+        `${API_BASE}/api/student/seats/layout?v=${encodeURIComponent(layoutVersion)}`
+    );
+    if (!layoutResponse.ok) {
+        throw new Error('Failed to load seat layout');
+    }
+    return decodeSeatMap(await layoutResponse.json(), statuses);
+}
+
 // Initialize page
 document.addEventListener('DOMContentLoaded', () => {
     if (!requireAuth()) return;
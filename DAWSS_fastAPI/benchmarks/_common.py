@@ -0,0 +1,67 @@
+"""
+Shared setup for the benchmarks
+
+Importing this module points the app at a fresh SQLite database in a
+temporary directory (never the committed prom_management.db) and moves to
+DAWSS_fastAPI/ so the app's relative paths resolve. Import it before any
+app module; settings a benchmark needs on top (e.g.
+SEAT_INDEX_REFRESH_SECONDS) go into os.environ before this import.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+def temp_database_url() -> str:
+    """URL of a new, empty SQLite file"""
+    return f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='prom_bench_'), 'bench.db')}"
+
+
+os.environ["DATABASE_URL"] = temp_database_url()
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+# The app reads DATABASE_URL when it is imported
+from sqlalchemy import insert
+
+from app.core.models.user import User, UserRole
+from app.core.models.seating import Table, Seat, SeatStatus
+from app.core.utils.auth import create_access_token
+
+ADMIN_EMAIL = "admin@prom.com"
+
+
+def add_seats(db, seats: int, status: SeatStatus = SeatStatus.AVAILABLE):
+    """Table 1 with seats 1..seats (seat id == seat number); db is a Session or Connection"""
+    db.execute(insert(Table), [{"id": 1, "table_number": 1, "capacity": seats, "is_active": True}])
+    db.execute(insert(Seat), [
+        {"id": i, "seat_number": i, "table_id": 1, "status": status} for i in range(1, seats + 1)
+    ])
+
+
+def add_students(db, students: int, hashed_password: str = "x"):
+    """Students 1..students, signed in as s<id>@school.com"""
+    db.execute(insert(User), [
+        {"id": i, "email": student_email(i), "hashed_password": hashed_password, "full_name": f"Student {i}",
+         "student_id": f"STU{i}", "role": UserRole.STUDENT, "is_active": True}
+        for i in range(1, students + 1)
+    ])
+
+
+def add_admin(db, hashed_password: str = "x"):
+    db.execute(insert(User), [
+        {"email": ADMIN_EMAIL, "hashed_password": hashed_password, "full_name": "Admin",
+         "role": UserRole.ADMIN, "is_active": True}
+    ])
+
+
+def student_email(user_id: int) -> str:
+    return f"s{user_id}@school.com"
+
+
+def auth_header(email: str) -> dict:
+    """Authorization header with a fresh access token for this user"""
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
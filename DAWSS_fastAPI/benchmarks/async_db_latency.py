@@ -0,0 +1,175 @@
+"""
+Concurrent latency benchmark: sync Session vs AsyncSession inside async routes
+
+Serves the same lookup (user by email + their booking) through two routes on
+a throwaway app. The first uses a synchronous Session, as the routers did
+before, which runs the query on the event loop thread; the second uses an
+AsyncSession (aiosqlite). Every query also calls a small ``io_delay()`` SQL
+function that sleeps for --io-delay-ms to stand in for disk or lock waits.
+
+Both sides get the same engine setup: a QueuePool of --pool-size
+connections (default: one per client, no overflow) and the configured
+engine profile. The pool has to cover every client for the sync side: a
+sync checkout that has to wait blocks the event loop, and with it the
+sessions that would return their connections, so it stalls for the full
+pool timeout. The async side could share a smaller pool, but then the
+comparison would measure pool queueing rather than the session type.
+
+Usage (from DAWSS_fastAPI/):
+    python -m benchmarks.async_db_latency --clients 200 --requests 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks._common import add_seats, add_students, student_email
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.dependencies.database import (
+    ASYNC_DATABASE_URL, DATABASE_URL, ENGINE_PROFILE, Base, SessionLocal, engine
+)
+from app.core.dependencies.engine_profile import apply_profile
+from app.core.models.user import User
+from app.core.models.seating import Booking, SeatStatus
+
+IO_DELAY_SECONDS = 0.0
+SyncSession = None
+AsyncSessionFactory = None
+
+
+def _io_delay():
+    time.sleep(IO_DELAY_SECONDS)
+    return 1
+
+
+def _register_delay(dbapi_connection, connection_record):
+    dbapi_connection.create_function("io_delay", 0, _io_delay)
+
+
+def make_engines(pool_size: int):
+    """Sync and async engines with identical pool sizing and PRAGMAs"""
+    global SyncSession, AsyncSessionFactory
+    pool = {"pool_size": pool_size, "max_overflow": 0, "pool_timeout": 30}
+    sync_engine = create_engine(
+        DATABASE_URL, poolclass=QueuePool, connect_args={"check_same_thread": False}, **pool
+    )
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool, **pool)
+    for target in (sync_engine, async_engine.sync_engine):
+        apply_profile(target, ENGINE_PROFILE)
+        event.listen(target, "connect", _register_delay)
+    SyncSession = sessionmaker(bind=sync_engine)
+    AsyncSessionFactory = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+def seed(users: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        add_seats(db, users, SeatStatus.RESERVED)
+        add_students(db, users)
+        db.execute(insert(Booking), [
+            {"user_id": i, "seat_id": i, "payment_status": "completed", "payment_amount": 50.0}
+            for i in range(1, users + 1)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def lookup_statement(email: str):
+    return (
+        select(User.id, Booking.id, func.io_delay())
+        .outerjoin(Booking, Booking.user_id == User.id)
+        .where(User.email == email)
+    )
+
+
+def get_sync_db():
+    db = SyncSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionFactory() as db:
+        yield db
+
+
+app = FastAPI()
+
+
+@app.get("/sync/{email}")
+async def sync_lookup(email: str, db: Session = Depends(get_sync_db)):
+    row = db.execute(lookup_statement(email)).first()
+    return {"user_id": row[0], "booking_id": row[1]}
+
+
+@app.get("/async/{email}")
+async def async_lookup(email: str, db: AsyncSession = Depends(get_async_db)):
+    row = (await db.execute(lookup_statement(email))).first()
+    return {"user_id": row[0], "booking_id": row[1]}
+
+
+async def run(prefix: str, clients: int, requests: int, users: int):
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker(n: int):
+            for i in range(requests):
+                email = student_email((n * requests + i) % users + 1)
+                start = time.perf_counter()
+                response = await client.get(f"/{prefix}/{email}")
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def measure(prefix: str, clients: int, requests: int, users: int):
+    await run(prefix, clients, 1, users)  # warm-up: opens the pool's connections, not measured
+    return await run(prefix, clients, requests, users)
+
+
+def main():
+    global IO_DELAY_SECONDS
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--io-delay-ms", type=float, default=1.0)
+    parser.add_argument("--pool-size", type=int, help="connections per engine (default: --clients)")
+    args = parser.parse_args()
+    IO_DELAY_SECONDS = args.io_delay_ms / 1000
+    pool_size = args.pool_size or args.clients
+
+    seed(args.users)
+    make_engines(pool_size)
+    print(f"{args.clients} concurrent clients x {args.requests} requests, io delay {args.io_delay_ms}ms, "
+          f"pool {pool_size} per engine\n")
+    print(f"{'session':<10} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for prefix in ("sync", "async"):
+        result = asyncio.run(measure(prefix, args.clients, args.requests, args.users))
+        print(f"{prefix:<10} {result['requests']:>9} {result['rps']:>9.0f} {result['p50']:>9.1f} {result['p99']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Seat booking contention check
+
+Fires N concurrent ``POST /api/student/book-seat`` requests from N different
+students at the same seat and verifies that exactly one wins, every loser
+gets a fast 409/400 (no retries), and the database is left consistent: one
+booking for the seat and no SELECTED seat without a booking.
+
+Usage (from DAWSS_fastAPI/):
+    python -m benchmarks.booking_contention --students 200 --rounds 5
+"""
+import argparse
+import asyncio
+import collections
+import sys
+import time
+
+from benchmarks._common import add_seats, add_students, auth_header, student_email
+
+import httpx
+from sqlalchemy import func, select
+
+from app.core.dependencies.database import Base, SessionLocal, engine
+from app.core.models.seating import Seat, Booking, SeatStatus
+from app.main import app
+
+
+def seed(students: int, rounds: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        add_seats(db, rounds)
+        add_students(db, students * rounds)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def contend(client: httpx.AsyncClient, seat_id: int, user_ids):
+    async def book(user_id: int):
+        response = await client.post(
+            "/api/student/book-seat",
+            json={"seat_id": seat_id},
+            headers=auth_header(student_email(user_id)),
+        )
+        return response.status_code
+
+    return await asyncio.gather(*(book(user_id) for user_id in user_ids))
+
+
+def check_consistency(seat_ids):
+    db = SessionLocal()
+    try:
+        problems = []
+        for seat_id in seat_ids:
+            bookings = db.scalar(select(func.count()).select_from(Booking).where(Booking.seat_id == seat_id))
+            seat_status = db.scalar(select(Seat.status).where(Seat.id == seat_id))
+            if bookings != 1:
+                problems.append(f"seat {seat_id}: {bookings} bookings")
+            if seat_status != SeatStatus.SELECTED:
+                problems.append(f"seat {seat_id}: status {seat_status}")
+        orphaned = db.scalar(
+            select(func.count()).select_from(Seat)
+            .outerjoin(Booking, Booking.seat_id == Seat.id)
+            .where(Seat.status == SeatStatus.SELECTED, Booking.id.is_(None))
+        )
+        if orphaned:
+            problems.append(f"{orphaned} SELECTED seats without a booking")
+        return problems
+    finally:
+        db.close()
+
+
+async def run(students: int, rounds: int):
+    transport = httpx.ASGITransport(app=app)
+    failures = 0
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for seat_id in range(1, rounds + 1):
+            user_ids = range((seat_id - 1) * students + 1, seat_id * students + 1)
+            start = time.perf_counter()
+            codes = await contend(client, seat_id, user_ids)
+            elapsed = time.perf_counter() - start
+            counts = collections.Counter(codes)
+            ok = counts[201] == 1 and set(counts) <= {201, 400, 409}
+            failures += not ok
+            print(f"seat {seat_id}: {dict(sorted(counts.items()))} in {elapsed * 1000:.0f}ms {'OK' if ok else 'FAIL'}")
+
+    problems = check_consistency(range(1, rounds + 1))
+    for problem in problems:
+        print(f"inconsistent: {problem}")
+    return failures == 0 and not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=200, help="concurrent bookings per seat")
+    parser.add_argument("--rounds", type=int, default=5, help="number of seats to contend for")
+    args = parser.parse_args()
+
+    seed(args.students, args.rounds)
+    passed = asyncio.run(run(args.students, args.rounds))
+    print("PASS" if passed else "FAIL")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Idempotency-Key check for book-seat and payment
+
+Fires bursts of identical requests at the same moment, in-process, the way a
+double-click or a mobile retry arrives: the duplicates reach the server
+while the first request is still in its transaction. With a shared
+Idempotency-Key, exactly one of them must do the work and every response
+must be the same. Also checks that a late retry is replayed, that reusing a
+key for a different request is refused, and that keys do not leak between
+students. Exits non-zero on any failure.
+
+Usage (from DAWSS_fastAPI/):
+    python -m benchmarks.idempotency_check --duplicates 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+
+os.environ["SEAT_INDEX_REFRESH_SECONDS"] = "0"
+
+from benchmarks._common import add_seats, add_students, auth_header, student_email
+
+import httpx
+from sqlalchemy import func, select
+
+from app.core.dependencies.database import Base, SessionLocal, engine
+from app.core.models.seating import Booking, PaymentOutbox
+from app.core.utils.metrics import booking_conflicts_total, payment_outcomes_total
+from app.core.utils.payment_outbox import payment_workers
+from app.core.utils.seat_index import seat_index
+from app.main import app
+
+failures = []
+
+
+def check(ok: bool, what: str):
+    print(f"{'ok  ' if ok else 'FAIL'} {what}")
+    if not ok:
+        failures.append(what)
+
+
+def setup(students: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        add_seats(db, 10)
+        add_students(db, students)
+        db.commit()
+        seat_index.reload(db)
+    finally:
+        db.close()
+    return [auth_header(student_email(i)) for i in range(1, students + 1)]
+
+
+def bookings_of(user_id: int) -> int:
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count()).select_from(Booking).where(Booking.user_id == user_id))
+    finally:
+        db.close()
+
+
+def outbox_rows(booking_id: int) -> int:
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count()).select_from(PaymentOutbox).where(PaymentOutbox.booking_id == booking_id))
+    finally:
+        db.close()
+
+
+async def settled(client, headers: dict, booking_id: int) -> str:
+    """Poll the payment status until the worker has answered"""
+    while True:
+        state = (await client.get(f"/api/payment/status/{booking_id}", headers=headers)).json()
+        if state["payment_status"] != "processing":
+            return state["payment_status"]
+        await asyncio.sleep(state["poll_after_seconds"] / 10)
+
+
+def summary(responses) -> str:
+    statuses = sorted(r.status_code for r in responses)
+    replayed = sum(r.headers.get("idempotent-replayed") == "true" for r in responses)
+    return f"statuses {statuses[0]}..{statuses[-1]}, {replayed} replayed"
+
+
+async def burst(client, n: int, url: str, headers: dict, json: dict):
+    return await asyncio.gather(*(client.post(url, headers=headers, json=json) for _ in range(n)))
+
+
+async def run(duplicates: int):
+    alice, bob, carol = setup(3)
+    payment_workers.start()  # ASGITransport does not run the startup events
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+        for headers in (alice, bob, carol):
+            await client.get("/api/student/tables", headers=headers)  # warm the token cache
+
+        # Concurrent duplicate bookings
+        conflicts_before = sum(booking_conflicts_total.value(s) for s in ("claim", "update"))
+        key = {**alice, "Idempotency-Key": str(uuid.uuid4())}
+        responses = await burst(client, duplicates, "/api/student/book-seat", key, {"seat_id": 1})
+        print(f"book-seat x{duplicates}: {summary(responses)}")
+        check(all(r.status_code == 201 for r in responses), "every duplicate booking gets the 201")
+        check(len({r.content for r in responses}) == 1, "every duplicate booking gets the same body")
+        check(sum(r.headers.get("idempotent-replayed") == "true" for r in responses) == duplicates - 1,
+              "all but one booking response are replays")
+        check(bookings_of(1) == 1, "exactly one booking row")
+        conflicts_after = sum(booking_conflicts_total.value(s) for s in ("claim", "update"))
+        check(conflicts_after == conflicts_before, "no duplicate reached the seat claim")
+        booking = responses[0].json()
+
+        late = await client.post("/api/student/book-seat", headers=key, json={"seat_id": 1})
+        check(late.status_code == 201 and late.content == responses[0].content
+              and late.headers.get("idempotent-replayed") == "true", "a late retry is replayed")
+        other = await client.post("/api/student/book-seat", headers=key, json={"seat_id": 2})
+        check(other.status_code == 422, "the key reused for a different seat is refused (422)")
+
+        # The same key from another student is a different request
+        bob_key = {**bob, "Idempotency-Key": key["Idempotency-Key"]}
+        bob_booking = await client.post("/api/student/book-seat", headers=bob_key, json={"seat_id": 1})
+        check(bob_booking.status_code in (400, 409) and "idempotent-replayed" not in bob_booking.headers,
+              "another student's identical key is not replayed")
+
+        # Concurrent duplicate payments
+        queued = payment_outcomes_total.value("queued")
+        already_paid = payment_outcomes_total.value("already_paid")
+        pay_key = {**alice, "Idempotency-Key": str(uuid.uuid4())}
+        payment = {"booking_id": booking["id"], "payment_method": "credit_card", "payment_token": "tok_test"}
+        responses = await burst(client, duplicates, "/api/payment/process", pay_key, payment)
+        print(f"payment x{duplicates}: {summary(responses)}")
+        check(all(r.status_code == 202 for r in responses), "every duplicate payment gets the 202")
+        check(len({r.content for r in responses}) == 1, "every duplicate payment gets the same body")
+        check(payment_outcomes_total.value("queued") == queued + 1, "the payment was queued once")
+        check(outbox_rows(booking["id"]) == 1, "exactly one outbox row")
+        check(payment_outcomes_total.value("already_paid") == already_paid, "no duplicate saw 'already paid'")
+        check(await settled(client, alice, booking["id"]) == "completed", "the queued payment completes")
+
+        # Without a key nothing changes: duplicates do the work and lose
+        plain = await burst(client, duplicates, "/api/student/book-seat", carol, {"seat_id": 3})
+        print(f"book-seat x{duplicates} without a key: statuses {sorted(r.status_code for r in plain)}")
+        check(sum(r.status_code == 201 for r in plain) == 1 and bookings_of(3) == 1,
+              "without a key one booking wins and the rest are refused")
+    payment_workers.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duplicates", type=int, default=20, help="identical requests per burst")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.duplicates))
+    print("FAIL" if failures else "PASS")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Seat-map serialisation benchmark: validated response_model path vs orjson
+
+Builds a seat index with 100 / 1,000 / 10,000 seats and encodes the
+/api/student/tables payload two ways:
+
+    response_model  what FastAPI does by default: validate against
+                    List[TableResponse], jsonable_encoder, json.dumps
+    orjson          the FAST_JSON=1 path: ORJSONResponse of the plain dicts
+
+Reports median encode time and peak traced memory (tracemalloc) per request,
+and checks that both produce the same JSON.
+
+Usage (from DAWSS_fastAPI/):
+    python -m benchmarks.json_serialization --repeat 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.models.seating import SeatStatus
+from app.core.schemas.schemas import TableResponse
+from app.core.utils.seat_index import SeatIndex
+
+SEATS_PER_TABLE = 10
+STATUSES = list(SeatStatus)
+FIELD = create_response_field(name="Response_get_available_tables", type_=List[TableResponse])
+LOOP = asyncio.new_event_loop()  # reused so loop setup is not timed
+
+
+def build_tables(seats: int) -> list:
+    index = SeatIndex(refresh_seconds=0)
+    table_count = max(1, seats // SEATS_PER_TABLE)
+    table_rows = [(t, t, SEATS_PER_TABLE, t * 10.0, 5.0, True, "Main Floor") for t in range(1, table_count + 1)]
+    seat_rows = [
+        (i, (i - 1) % SEATS_PER_TABLE + 1, (i - 1) // SEATS_PER_TABLE + 1, STATUSES[i % len(STATUSES)])
+        for i in range(1, seats + 1)
+    ]
+    index.load_rows(table_rows, seat_rows)
+    return index.tables()
+
+
+def encode_default(tables: list) -> bytes:
+    content = LOOP.run_until_complete(serialize_response(field=FIELD, response_content=tables))
+    return JSONResponse(content).body
+
+
+def encode_orjson(tables: list) -> bytes:
+    return ORJSONResponse(tables).body
+
+
+def measure(encode, tables: list, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = encode(tables)
+        times.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    encode(tables)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), (peak - base) / 1024, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seats", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'seats':>7} {'path':<15} {'median ms':>10} {'peak KiB':>10} {'body KiB':>9}")
+    ok = True
+    for seats in args.seats:
+        tables = build_tables(seats)
+        results = {}
+        for name, encode in (("response_model", encode_default), ("orjson", encode_orjson)):
+            ms, peak, body = measure(encode, tables, args.repeat)
+            results[name] = (ms, body)
+            print(f"{seats:>7} {name:<15} {ms:>10.2f} {peak:>10.0f} {len(body) / 1024:>9.0f}")
+        (default_ms, default_body), (fast_ms, fast_body) = results["response_model"], results["orjson"]
+        same = json.loads(default_body) == json.loads(fast_body)
+        ok = ok and same
+        print(f"{'':>7} speed-up {default_ms / fast_ms:.1f}x, identical JSON: {'yes' if same else 'NO'}")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Per-request cost of the metrics middleware
+
+Calls a minimal ASGI app directly (no server, no sockets) many times, with
+and without MetricsMiddleware in front of it, and reports the difference
+per request. Also times the individual recording calls and one /metrics
+render with the resulting series. Exits non-zero if the middleware adds
+more than --limit-us microseconds per request.
+
+Usage (from DAWSS_fastAPI/):
+    python -m benchmarks.metrics_overhead --requests 200000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.utils.metrics import (
+    MetricsMiddleware,
+    http_request_duration_seconds,
+    http_responses_total,
+    registry,
+)
+
+
+class Route:
+    path = "/api/student/tables"
+
+
+async def plain_app(scope, receive, send):
+    scope["route"] = Route  # what the router leaves in the scope
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def per_request_us(app, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app({"type": "http", "method": "GET", "path": "/api/student/tables"}, receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def per_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--limit-us", type=float, default=20.0, help="fail above this overhead per request")
+    args = parser.parse_args()
+
+    wrapped = MetricsMiddleware(plain_app)
+    loop = asyncio.new_event_loop()
+    bare, instrumented = [], []
+    for _ in range(args.rounds):
+        bare.append(loop.run_until_complete(per_request_us(plain_app, args.requests)))
+        instrumented.append(loop.run_until_complete(per_request_us(wrapped, args.requests)))
+    overhead = statistics.median(instrumented) - statistics.median(bare)
+
+    print(f"bare ASGI app:          {statistics.median(bare):6.2f} us/request")
+    print(f"with MetricsMiddleware: {statistics.median(instrumented):6.2f} us/request")
+    print(f"overhead:               {overhead:6.2f} us/request")
+    observe_us = per_call_us(lambda: http_request_duration_seconds.observe(0.003, "GET", "/x"), args.requests)
+    inc_us = per_call_us(lambda: http_responses_total.inc("GET", "/x", "200"), args.requests)
+    print(f"histogram observe:      {observe_us:6.2f} us")
+    print(f"counter inc:            {inc_us:6.2f} us")
+
+    # A realistic scrape: every route template with a few status codes
+    for n in range(40):
+        for status in ("200", "400", "401", "404", "409"):
+            http_request_duration_seconds.observe(0.01, "GET", f"/route/{n}")
+            http_responses_total.inc("GET", f"/route/{n}", status)
+    start = time.perf_counter()
+    body = registry.render()
+    print(f"/metrics render:        {(time.perf_counter() - start) * 1000:6.2f} ms for {body.count(chr(10))} lines")
+
+    if overhead > args.limit_us:
+        print(f"FAIL: overhead above {args.limit_us} us")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+SQL query budget check per route
+
+Runs the main API routes in-process against datasets of increasing size and
+counts the SQL statements each request executes (X-DB-Queries, from
+QueryStatsMiddleware). A route fails if it runs more statements than its
+budget, or if its count changes with the dataset size - that is how an
+O(1) route turning into O(n) queries (an N+1) shows up. Exits non-zero on
+any failure, so it can gate a build.
+
+Read routes are measured on their second call (auth token cache and seat
+index warm). Writes are measured once, for a fresh student at each size.
+
+Usage (from DAWSS_fastAPI/):
+    python -m benchmarks.query_budget --sizes 10 100 1000
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+os.environ["QUERY_STATS_HEADER"] = "1"
+os.environ["SEAT_INDEX_REFRESH_SECONDS"] = "0"  # no periodic reloads mid-measurement
+
+from benchmarks._common import ADMIN_EMAIL, auth_header, student_email
+
+import httpx
+from sqlalchemy import func, insert, select
+
+from app.core.dependencies.database import Base, SessionLocal, engine
+from app.core.models.user import User, UserRole
+from app.core.models.seating import Table, Seat, Booking, SeatStatus
+from app.core.utils.seat_index import seat_index
+from app.main import app
+
+SEATS_PER_TABLE = 10
+
+# Maximum statements per request, by route
+BUDGETS = {
+    "GET /api/student/dashboard": 2,
+    "GET /api/student/tables": 0,
+    "GET /api/student/seats/changes": 0,
+    "GET /api/student/seats/status": 0,
+    "GET /api/student/my-booking": 1,
+    "GET /api/payment/confirmation/{id}": 1,
+    "GET /api/admin/dashboard": 1,
+    "GET /api/admin/dashboard/stats": 1,
+    "GET /api/admin/bookings": 1,
+    "POST /api/student/book-seat": 4,
+    "POST /api/payment/process": 3,
+    "GET /api/payment/status/{id}": 1,
+}
+
+
+def grow(seats: int):
+    """Add tables, seats, students and bookings until the venue has `seats` seats"""
+    db = SessionLocal()
+    try:
+        have = db.scalar(select(func.count()).select_from(Seat))
+        first_table = (db.scalar(select(func.max(Table.id))) or 0) + 1
+        tables = range(first_table, first_table + (seats - have) // SEATS_PER_TABLE)
+        if tables:
+            db.execute(insert(Table), [
+                {"id": t, "table_number": t, "capacity": SEATS_PER_TABLE, "is_active": True} for t in tables
+            ])
+            db.execute(insert(Seat), [
+                {"table_id": t, "seat_number": n, "status": SeatStatus.AVAILABLE}
+                for t in tables for n in range(1, SEATS_PER_TABLE + 1)
+            ])
+        # Book every other new seat; half of those bookings are paid
+        free = db.execute(
+            select(Seat.id).where(Seat.table_id >= first_table).order_by(Seat.id)
+        ).scalars().all()[::2]
+        first_user = (db.scalar(select(func.max(User.id))) or 0) + 1
+        db.execute(insert(User), [
+            {"id": first_user + i, "email": student_email(first_user + i), "hashed_password": "x",
+             "full_name": "Student", "role": UserRole.STUDENT, "is_active": True}
+            for i in range(len(free))
+        ])
+        db.execute(insert(Booking), [
+            {"user_id": first_user + i, "seat_id": seat_id, "payment_amount": 50.0,
+             "payment_status": "completed" if i % 2 else "pending"}
+            for i, seat_id in enumerate(free)
+        ])
+        for i, seat_id in enumerate(free):
+            db.query(Seat).filter(Seat.id == seat_id).update(
+                {"status": SeatStatus.RESERVED if i % 2 else SeatStatus.SELECTED}
+            )
+        db.commit()
+        seat_index.reload(db)
+        return first_user  # a student with a booking
+    finally:
+        db.close()
+
+
+def add_student(email: str, role: UserRole = UserRole.STUDENT):
+    db = SessionLocal()
+    try:
+        db.add(User(email=email, hashed_password="x", full_name="Budget", role=role, is_active=True))
+        db.commit()
+    finally:
+        db.close()
+    return auth_header(email)
+
+
+async def measure_size(client: httpx.AsyncClient, seats: int, admin: dict):
+    booked_user = grow(seats)
+    booked = auth_header(student_email(booked_user))
+    db = SessionLocal()
+    booking_id = db.scalar(select(Booking.id).where(Booking.user_id == booked_user))
+    free_seat = db.scalar(select(Seat.id).where(Seat.status == SeatStatus.AVAILABLE).order_by(Seat.id.desc()))
+    db.close()
+
+    counts = {}
+
+    async def count(name: str, method: str, url: str, headers: dict, json=None, warm: bool = True):
+        if warm:
+            await client.request(method, url, headers=headers, json=json)
+        response = await client.request(method, url, headers=headers, json=json)
+        assert response.status_code < 300, f"{name}: {response.status_code} {response.text}"
+        counts[name] = int(response.headers["x-db-queries"])
+        return response
+
+    await count("GET /api/student/dashboard", "GET", "/api/student/dashboard", booked)
+    await count("GET /api/student/tables", "GET", "/api/student/tables", booked)
+    await count("GET /api/student/seats/changes", "GET", "/api/student/seats/changes?since=0", booked)
+    await count("GET /api/student/seats/status", "GET", "/api/student/seats/status", booked)
+    await count("GET /api/student/my-booking", "GET", "/api/student/my-booking", booked)
+    await count("GET /api/payment/confirmation/{id}", "GET", f"/api/payment/confirmation/{booking_id}", booked)
+    await count("GET /api/admin/dashboard", "GET", "/api/admin/dashboard", admin)
+    await count("GET /api/admin/dashboard/stats", "GET", "/api/admin/dashboard/stats", admin)
+    await count("GET /api/admin/bookings", "GET", "/api/admin/bookings?limit=1000", admin)
+
+    fresh = add_student(f"budget{seats}@school.com")
+    await client.get("/api/student/tables", headers=fresh)  # warm the token cache
+    booking = await count("POST /api/student/book-seat", "POST", "/api/student/book-seat", fresh,
+                          json={"seat_id": free_seat}, warm=False)
+    await count("POST /api/payment/process", "POST", "/api/payment/process", fresh, warm=False, json={
+        "booking_id": booking.json()["id"], "payment_method": "credit_card", "payment_token": "tok_test"
+    })
+    await count("GET /api/payment/status/{id}", "GET", f"/api/payment/status/{booking.json()['id']}", fresh)
+    return counts
+
+
+async def run(sizes) -> bool:
+    Base.metadata.create_all(bind=engine)
+    admin = add_student(ADMIN_EMAIL, role=UserRole.ADMIN)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for seats in sorted(sizes):
+            results[seats] = await measure_size(client, seats, admin)
+
+    ok = True
+    print(f"{'route':<36} {'budget':>6} " + " ".join(f"{s:>7}" for s in sorted(sizes)) + "  seats")
+    for route, budget in BUDGETS.items():
+        counts = [results[s][route] for s in sorted(sizes)]
+        problems = []
+        if max(counts) > budget:
+            problems.append("over budget")
+        if len(set(counts)) > 1:
+            problems.append("grows with data")
+        ok = ok and not problems
+        print(f"{route:<36} {budget:>6} " + " ".join(f"{c:>7}" for c in counts)
+              + (f"  FAIL: {', '.join(problems)}" if problems else ""))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="venue sizes in seats")
+    args = parser.parse_args()
+
+    passed = asyncio.run(run(args.sizes))
+    print("PASS" if passed else "FAIL")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Idle WebSocket subscriber load test for the live seat-map push
+
+Starts the app under uvicorn in a subprocess, opens N idle subscribers on
+/api/student/seats/ws, and reports the server's resident memory per
+subscriber. It then makes admin seat-status changes and checks that every
+subscriber receives every change, reporting fan-out latency. Finally it
+checks in-process that a subscriber which stops reading is evicted once its
+send buffer is full. Exits non-zero if a message goes missing or eviction
+fails. RSS is read from /proc, so memory figures need Linux.
+
+The server runs with --ws-per-message-deflate false, as run.py does; pass
+--deflate to see the cost of uvicorn's default per-connection zlib contexts.
+
+Usage (from DAWSS_fastAPI/):
+    python -m benchmarks.seat_push_subscribers --subscribers 5000 --changes 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks._common import ADMIN_EMAIL, add_admin, add_seats, add_students, auth_header, student_email
+
+import httpx
+import websockets
+
+from app.core.dependencies.database import Base, SessionLocal, engine
+from app.core.utils.auth import create_access_token
+from app.core.utils.seat_broadcast import SeatBroadcaster, EVICTED
+
+
+def seed(seats: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        add_seats(db, seats)
+        add_students(db, 1)
+        add_admin(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_kib(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def start_server(port: int, subscribers: int, deflate: bool) -> subprocess.Popen:
+    env = {**os.environ, "SEAT_PUSH_MAX_SUBSCRIBERS": str(subscribers + 100), "PASSWORD_HASH_WORKERS": "1"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning",
+         "--backlog", "4096", "--ws-per-message-deflate", "true" if deflate else "false"],
+        env=env,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+async def connect_all(url: str, count: int, batch: int = 250):
+    connections = []
+    for start in range(0, count, batch):
+        group = await asyncio.gather(*(websockets.connect(url, max_queue=None) for _ in range(min(batch, count - start))))
+        for ws in group:
+            hello = json.loads(await ws.recv())
+            assert hello["type"] == "hello", hello
+        connections.extend(group)
+    return connections
+
+
+async def fan_out(base: str, connections, changes: int):
+    """Make seat changes and time how long until each subscriber has each one"""
+    admin = auth_header(ADMIN_EMAIL)
+    latencies, missing = [], 0
+    async with httpx.AsyncClient(base_url=base) as client:
+        for n in range(changes):
+            seat_id = n + 1
+            started = time.perf_counter()
+            response = await client.put(
+                f"/api/admin/seats/{seat_id}/status", json={"seat_id": seat_id, "status": "blocked"}, headers=admin
+            )
+            assert response.status_code == 200, response.text
+
+            async def receive(ws):
+                try:
+                    while True:
+                        message = json.loads(await asyncio.wait_for(ws.recv(), timeout=10))
+                        if message["type"] == "seats":
+                            return message["changes"][0]["id"] == seat_id, time.perf_counter() - started
+                except asyncio.TimeoutError:
+                    return False, None
+
+            results = await asyncio.gather(*(receive(ws) for ws in connections))
+            missing += sum(1 for ok, _ in results if not ok)
+            latencies.append(max((t for ok, t in results if ok), default=float("nan")) * 1000)
+    return latencies, missing
+
+
+async def check_eviction(buffer: int) -> bool:
+    broadcaster = SeatBroadcaster(buffer=buffer)
+    broadcaster.start(asyncio.get_running_loop())
+    reader, stalled = broadcaster.subscribe(), broadcaster.subscribe()
+    for n in range(buffer + 1):
+        broadcaster.publish(f"message {n}")
+        await reader.queue.get()  # this one keeps up
+    return (
+        broadcaster.evictions == 1
+        and broadcaster.subscriber_count == 1
+        and stalled.queue.qsize() == 1
+        and stalled.queue.get_nowait() is EVICTED
+    )
+
+
+async def run(args):
+    seed(max(args.changes, 1))
+    port = free_port()
+    server = start_server(port, args.subscribers, args.deflate)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        baseline = rss_kib(server.pid)
+
+        token = create_access_token(data={"sub": student_email(1)})
+        started = time.perf_counter()
+        connections = await connect_all(f"ws://127.0.0.1:{port}/api/student/seats/ws?token={token}", args.subscribers)
+        connect_s = time.perf_counter() - started
+        connected = rss_kib(server.pid)
+
+        await asyncio.sleep(args.idle)
+        idle = rss_kib(server.pid)
+
+        latencies, missing = await fan_out(base, connections, args.changes)
+        after = rss_kib(server.pid)
+
+        print(f"{args.subscribers} subscribers connected in {connect_s:.1f}s")
+        if baseline:
+            per_sub = (connected - baseline) / max(1, args.subscribers)
+            print(f"server RSS: {baseline / 1024:.1f} MiB idle -> {connected / 1024:.1f} MiB connected "
+                  f"({per_sub:.1f} KiB/subscriber), {idle / 1024:.1f} MiB after {args.idle:.0f}s idle, "
+                  f"{after / 1024:.1f} MiB after fan-out")
+        print(f"fan-out of {args.changes} changes to all subscribers: "
+              f"p50 {statistics.median(latencies):.1f}ms, max {max(latencies):.1f}ms, missing {missing}")
+
+        await asyncio.gather(*(ws.close() for ws in connections))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    evicted = await check_eviction(args.buffer)
+    print(f"slow consumer evicted after {args.buffer} buffered messages: {'yes' if evicted else 'NO'}")
+    return missing == 0 and evicted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--changes", type=int, default=20)
+    parser.add_argument("--idle", type=float, default=5.0, help="seconds to hold the idle connections")
+    parser.add_argument("--buffer", type=int, default=32, help="send buffer for the eviction check")
+    parser.add_argument("--deflate", action="store_true", help="enable permessage-deflate (as uvicorn does by default)")
+    args = parser.parse_args()
+
+    if not asyncio.run(run(args)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Ticket-drop load simulation
+
+Seeds a synthetic venue and grade in a temporary database, starts the app
+under uvicorn in a subprocess and has every student go through the real
+purchase flow at once:
+
+    POST /api/auth/login -> GET /api/student/tables -> POST /api/student/book-seat
+    -> POST /api/payment/process -> GET /api/payment/status/{id} until settled
+
+A student who loses a seat (409, or 400 when the seat map they saw was
+already stale) re-reads the tables and tries another seat, up to --retries
+times. Logins turned away with 503 by the hashing pool are retried after
+Retry-After, as a browser user would.
+
+Payments are charged by the server's payment workers against the stub
+gateway (--gateway-latency-ms, --gateway-failure-rate); "confirm" is the
+time from POST /process to seeing the payment completed.
+
+Reports throughput, p50/p95/p99 latency and status codes per endpoint, the
+seat conflict rate, and checks the final state: no seat or student with two
+bookings, no SELECTED seat without a booking, seat status matching payment
+status, and the server's seat counters matching the database. Exits
+non-zero if any check fails.
+
+Usage (from DAWSS_fastAPI/):
+    python -m benchmarks.ticket_drop --students 500 --tables 50 --popular
+"""
+import argparse
+import asyncio
+import collections
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks._common import ADMIN_EMAIL, add_admin, add_students, auth_header, student_email
+
+import httpx
+from sqlalchemy import func, insert, select
+
+from app.core.dependencies.database import Base, SessionLocal, engine
+from app.core.models.seating import Table, Seat, Booking, SeatStatus
+from app.core.utils.hashing import get_password_hash
+
+PASSWORD = "ticket-drop"
+ENDPOINTS = ("login", "tables", "book-seat", "payment", "pay-status", "confirm")
+
+
+def seed(students: int, tables: int, seats_per_table: int):
+    Base.metadata.create_all(bind=engine)
+    hashed = get_password_hash(PASSWORD)  # one hash shared by every synthetic student
+    db = SessionLocal()
+    try:
+        db.execute(insert(Table), [
+            {"id": t, "table_number": t, "capacity": seats_per_table, "section": "Main Floor",
+             "position_x": float(t % 10), "position_y": float(t // 10), "is_active": True}
+            for t in range(1, tables + 1)
+        ])
+        db.execute(insert(Seat), [
+            {"table_id": t, "seat_number": n, "status": SeatStatus.AVAILABLE}
+            for t in range(1, tables + 1)
+            for n in range(1, seats_per_table + 1)
+        ])
+        add_students(db, students, hashed)
+        add_admin(db, hashed)
+        db.commit()
+    finally:
+        db.close()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning",
+         "--backlog", "4096", "--ws-per-message-deflate", "false"],
+        env=dict(os.environ),
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+def percentile(values, p: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class Recorder:
+    """Latency and status code per endpoint"""
+
+    def __init__(self):
+        self.latencies = collections.defaultdict(list)
+        self.statuses = collections.defaultdict(collections.Counter)
+
+    async def call(self, endpoint: str, request):
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError as e:
+            self.statuses[endpoint][type(e).__name__] += 1
+            return None
+        self.latencies[endpoint].append((time.perf_counter() - start) * 1000)
+        self.statuses[endpoint][response.status_code] += 1
+        return response
+
+
+async def student_flow(client: httpx.AsyncClient, rec: Recorder, user_id: int, retries: int, popular: bool):
+    """One student's purchase; returns how it ended"""
+    credentials = {"email": student_email(user_id), "password": PASSWORD}
+    for _ in range(retries + 1):
+        response = await rec.call("login", client.post("/api/auth/login", json=credentials))
+        if response is None or response.status_code != 503:
+            break
+        await asyncio.sleep(float(response.headers.get("retry-after", "1")) * random.uniform(0.5, 1.5))
+    if response is None or response.status_code != 200:
+        return "login failed"
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    booking = None
+    for _ in range(retries + 1):
+        response = await rec.call("tables", client.get("/api/student/tables", headers=headers))
+        if response is None or response.status_code != 200:
+            return "tables failed"
+        available = [
+            seat["id"] for table in response.json() for seat in table["seats"] if seat["status"] == "available"
+        ]
+        if not available:
+            return "sold out"
+        # --popular: everyone goes for the first free seats (front tables), as real crowds do
+        seat_id = available[min(int(random.expovariate(1 / 5)), len(available) - 1)] if popular \
+            else random.choice(available)
+
+        response = await rec.call(
+            "book-seat", client.post("/api/student/book-seat", json={"seat_id": seat_id}, headers=headers)
+        )
+        if response is None:
+            return "book failed"
+        if response.status_code == 201:
+            booking = response.json()
+            break
+        if response.status_code not in (400, 409):
+            return "book failed"
+    if booking is None:
+        return "gave up"
+
+    paid_from = time.perf_counter()
+    response = await rec.call("payment", client.post(
+        "/api/payment/process",
+        json={"booking_id": booking["id"], "payment_method": "credit_card", "payment_token": "tok_test"},
+        headers=headers,
+    ))
+    if response is None or response.status_code != 202:
+        return "payment failed"
+    status_url = response.headers["location"]
+    while True:
+        response = await rec.call("pay-status", client.get(status_url, headers=headers))
+        if response is None or response.status_code != 200:
+            return "payment failed"
+        state = response.json()
+        if state["payment_status"] != "processing":
+            break
+        await asyncio.sleep(state["poll_after_seconds"])
+    if state["payment_status"] != "completed":
+        return "payment declined"
+    rec.latencies["confirm"].append((time.perf_counter() - paid_from) * 1000)
+    return "purchased"
+
+
+def check_consistency(base: str):
+    problems = []
+    db = SessionLocal()
+    try:
+        double_seats = db.execute(
+            select(Booking.seat_id).group_by(Booking.seat_id).having(func.count() > 1)
+        ).scalars().all()
+        if double_seats:
+            problems.append(f"{len(double_seats)} seats booked more than once")
+        double_users = db.execute(
+            select(Booking.user_id).group_by(Booking.user_id).having(func.count() > 1)
+        ).scalars().all()
+        if double_users:
+            problems.append(f"{len(double_users)} students with more than one booking")
+        orphaned = db.scalar(
+            select(func.count()).select_from(Seat)
+            .outerjoin(Booking, Booking.seat_id == Seat.id)
+            .where(Seat.status.in_([SeatStatus.SELECTED, SeatStatus.RESERVED]), Booking.id.is_(None))
+        )
+        if orphaned:
+            problems.append(f"{orphaned} SELECTED/RESERVED seats without a booking")
+        mismatched = db.scalar(
+            select(func.count()).select_from(Booking).join(Seat, Booking.seat_id == Seat.id)
+            .where(
+                ((Booking.payment_status == "completed") & (Seat.status != SeatStatus.RESERVED))
+                | ((Booking.payment_status != "completed") & (Seat.status != SeatStatus.SELECTED))
+            )
+        )
+        if mismatched:
+            problems.append(f"{mismatched} bookings whose seat status does not match the payment status")
+        db_available = db.scalar(select(func.count()).select_from(Seat).where(Seat.status == SeatStatus.AVAILABLE))
+        paid = db.scalar(select(func.count()).select_from(Booking).where(Booking.payment_status == "completed"))
+    finally:
+        db.close()
+
+    admin = auth_header(ADMIN_EMAIL)
+    stats = httpx.get(f"{base}/api/admin/dashboard/stats", headers=admin, timeout=30).json()
+    if stats["available_seats"] != db_available:
+        problems.append(f"server reports {stats['available_seats']} available seats, database has {db_available}")
+    return problems, paid
+
+
+async def run(args) -> bool:
+    seed(args.students, args.tables, args.seats_per_table)
+    port = free_port()
+    server = start_server(port)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        rec = Recorder()
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as client:
+            gate = asyncio.Semaphore(args.concurrency)
+
+            async def student(user_id: int):
+                async with gate:
+                    return await student_flow(client, rec, user_id, args.retries, args.popular)
+
+            started = time.perf_counter()
+            outcomes = collections.Counter(await asyncio.gather(*(student(i) for i in range(1, args.students + 1))))
+            wall = time.perf_counter() - started
+
+        problems, paid = check_consistency(base)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    seats = args.tables * args.seats_per_table
+    requests = sum(sum(codes.values()) for codes in rec.statuses.values())  # "confirm" is not a request
+    print(f"{args.students} students, {seats} seats, concurrency {args.concurrency}, "
+          f"{'popular' if args.popular else 'random'} seat choice")
+    print(f"{'endpoint':<10} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  status codes")
+    for endpoint in ENDPOINTS:
+        latencies = rec.latencies[endpoint]
+        codes = ", ".join(f"{code}: {n}" for code, n in sorted(rec.statuses[endpoint].items(), key=str))
+        print(f"{endpoint:<10} {len(latencies):>8} {percentile(latencies, 50):>8.1f} "
+              f"{percentile(latencies, 95):>8.1f} {percentile(latencies, 99):>8.1f}  {codes}")
+
+    attempts = sum(rec.statuses["book-seat"].values())
+    conflicts = rec.statuses["book-seat"][409] + rec.statuses["book-seat"][400]
+    print(f"wall time {wall:.1f}s, {requests / wall:.0f} requests/s, {outcomes['purchased'] / wall:.1f} purchases/s")
+    print(f"seat conflicts: {conflicts} of {attempts} booking attempts ({conflicts / max(1, attempts):.1%}; "
+          f"409: {rec.statuses['book-seat'][409]}, 400: {rec.statuses['book-seat'][400]})")
+    print("outcomes: " + ", ".join(f"{k}: {v}" for k, v in outcomes.most_common()))
+
+    if outcomes["purchased"] != paid:
+        problems.append(f"{outcomes['purchased']} purchases reported but {paid} paid bookings stored")
+    for problem in problems:
+        print(f"inconsistent: {problem}")
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--tables", type=int, default=50)
+    parser.add_argument("--seats-per-table", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=500, help="students in flight at once")
+    parser.add_argument("--retries", type=int, default=5, help="retries per student after a lost seat or a 503")
+    parser.add_argument("--popular", action="store_true", help="crowd onto the first free seats")
+    parser.add_argument("--gateway-latency-ms", type=float, default=200, help="stub gateway latency per charge")
+    parser.add_argument("--gateway-failure-rate", type=float, default=0, help="share of charges declined")
+    args = parser.parse_args()
+    os.environ["PAYMENT_GATEWAY_LATENCY_MS"] = str(args.gateway_latency_ms)
+    os.environ["PAYMENT_GATEWAY_FAILURE_RATE"] = str(args.gateway_failure_rate)
+
+    passed = asyncio.run(run(args))
+    print("PASS" if passed else "FAIL")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
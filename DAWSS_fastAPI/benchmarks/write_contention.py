@@ -0,0 +1,134 @@
+"""
+SQLite write-contention benchmark across engine profiles
+
+For each profile in engine_profile.PROFILES, builds a fresh database and runs
+writer threads that book and release seats (conditional UPDATE + INSERT in one
+transaction) alongside reader threads that load the seat map. Reports commits
+per second, write latency, reads per second and "database is locked" errors.
+
+Usage (from DAWSS_fastAPI/):
+    python -m benchmarks.write_contention --writers 16 --readers 16 --seconds 5
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+
+from benchmarks._common import add_seats, add_students, temp_database_url
+
+from sqlalchemy import create_engine, delete, insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.core.dependencies.database import Base
+from app.core.dependencies.engine_profile import PROFILES, apply_profile, pool_options
+from app.core.models.seating import Seat, Booking, SeatStatus
+
+
+def build_engine(profile_name: str, threads: int):
+    url = temp_database_url()
+    os.environ["DB_POOL_SIZE"] = str(threads)
+    engine = create_engine(url, connect_args={"check_same_thread": False}, **pool_options(url))
+    apply_profile(engine, PROFILES[profile_name])
+    return engine
+
+
+def seed(engine, seats: int, users: int):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        add_seats(conn, seats)
+        add_students(conn, users)
+
+
+def run_profile(profile_name: str, writers: int, readers: int, seconds: float, seats: int):
+    engine = build_engine(profile_name, writers + readers)
+    seed(engine, seats, writers)
+    Session = sessionmaker(bind=engine)
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {"commits": 0, "locked": 0, "reads": 0, "write_latencies": []}
+
+    def writer(user_id: int):
+        seat_id = user_id
+        while not stop.is_set():
+            start = time.perf_counter()
+            db = Session()
+            try:
+                claimed = db.execute(
+                    update(Seat).where(Seat.id == seat_id, Seat.status == SeatStatus.AVAILABLE)
+                    .values(status=SeatStatus.SELECTED)
+                ).rowcount
+                if claimed:
+                    db.execute(insert(Booking).values(user_id=user_id, seat_id=seat_id, payment_amount=50.0))
+                else:
+                    db.execute(delete(Booking).where(Booking.user_id == user_id))
+                    db.execute(update(Seat).where(Seat.id == seat_id).values(status=SeatStatus.AVAILABLE))
+                db.commit()
+                elapsed = time.perf_counter() - start
+                with lock:
+                    stats["commits"] += 1
+                    stats["write_latencies"].append(elapsed)
+            except OperationalError as error:
+                db.rollback()
+                if "locked" not in str(error):
+                    raise
+                with lock:
+                    stats["locked"] += 1
+            finally:
+                db.close()
+
+    def reader():
+        while not stop.is_set():
+            db = Session()
+            try:
+                db.execute(select(Seat.id, Seat.status, Seat.table_id)).all()
+                with lock:
+                    stats["reads"] += 1
+            except OperationalError as error:
+                if "locked" not in str(error):
+                    raise
+                with lock:
+                    stats["locked"] += 1
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(1, writers + 1)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    latencies = sorted(stats["write_latencies"]) or [0.0]
+    return {
+        "commits_per_s": stats["commits"] / seconds,
+        "reads_per_s": stats["reads"] / seconds,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000,
+        "locked": stats["locked"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--seats", type=int, default=500)
+    parser.add_argument("--profiles", nargs="*", default=list(PROFILES))
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds}s per profile\n")
+    print(f"{'profile':<12} {'commits/s':>10} {'write p50':>10} {'write p99':>10} {'reads/s':>9} {'locked':>7}")
+    for name in args.profiles:
+        result = run_profile(name, args.writers, args.readers, args.seconds, max(args.seats, args.writers))
+        print(f"{name:<12} {result['commits_per_s']:>10.0f} {result['p50']:>8.1f}ms {result['p99']:>8.1f}ms "
+              f"{result['reads_per_s']:>9.0f} {result['locked']:>7}")
+
+
+if __name__ == "__main__":
+    main()
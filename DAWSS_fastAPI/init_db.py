@@ -4,8 +4,10 @@ Creates initial admin user and sample tables/seats
 """
 from app.core.dependencies.database import SessionLocal, engine, Base
 from app.core.models.user import User, UserRole
-from app.core.models.seating import Table, Seat, SeatStatus
-from app.core.utils.auth import get_password_hash
+from app.core.models.seating import Table
+from app.core.schemas.schemas import TableCreate
+from app.core.utils.hashing import get_password_hash
+from app.core.utils.layout import apply_layout
 
 def init_database():
     # Create all tables
@@ -44,27 +46,17 @@ def init_database():
         # Create sample tables if they don't exist
         if db.query(Table).count() == 0:
             # Create 10 tables with 8 seats each
-            for table_num in range(1, 11):
-                section = "Main Floor" if table_num <= 6 else "Balcony"
-                table = Table(
+            sample_layout = [
+                TableCreate(
                     table_number=table_num,
                     capacity=8,
                     position_x=100.0 * (table_num % 3),
                     position_y=100.0 * (table_num // 3),
-                    section=section,
-                    is_active=True
+                    section="Main Floor" if table_num <= 6 else "Balcony"
                 )
-                db.add(table)
-                db.flush()
-
-                # Create seats for this table
-                for seat_num in range(1, 9):
-                    seat = Seat(
-                        seat_number=seat_num,
-                        table_id=table.id,
-                        status=SeatStatus.AVAILABLE
-                    )
-                    db.add(seat)
+                for table_num in range(1, 11)
+            ]
+            apply_layout(db, sample_layout, mode="merge")
 
             print("✓ Created 10 sample tables with 8 seats each (80 total seats)")
 
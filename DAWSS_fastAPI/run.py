@@ -62,7 +62,13 @@ def start_server(port=8000):
             sys.executable, "-m", "uvicorn",
             "app.main:app",
             "--reload",
-            "--port", str(port)
+            # Pages and static files are built at startup, so restart when they change
+            "--reload-include", "*.html",
+            "--reload-include", "*.css",
+            "--reload-include", "*.js",
+            "--port", str(port),
+            # Seat updates are tiny; a zlib context per WebSocket costs ~130 KiB
+            "--ws-per-message-deflate", "false"
         ])
     except KeyboardInterrupt:
         print("\n\n👋 Server stopped")